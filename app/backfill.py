@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+from app.candle_store import CandleStore, CandleSeries, CANDLE_DTYPE, INTERVAL_MS
+from app.collector import BINANCE_API_URL, MAX_KLINES_PER_REQUEST, KLINES_WEIGHT
+from app.rate_limiter import rate_limiter, PRIORITY_BACKFILL
+from config import CANDLE_STORE_DIR
+
+
+def klines_to_records(rows: List[list]) -> np.ndarray:
+    """Convert raw Binance kline rows into CANDLE_DTYPE records."""
+    records = np.empty(len(rows), dtype=CANDLE_DTYPE)
+    if rows:
+        raw = np.array([row[:6] for row in rows], dtype="float64")
+        records["timestamp"] = [int(row[0]) for row in rows]
+        records["open"] = raw[:, 1]
+        records["high"] = raw[:, 2]
+        records["low"] = raw[:, 3]
+        records["close"] = raw[:, 4]
+        records["volume"] = raw[:, 5]
+    return records
+
+
+class Backfiller:
+    """
+    Bulk historical kline backfill into the candle store.
+
+    Each symbol/interval is paged forward in maximum-size batches; pairs run
+    in parallel on a thread pool. Requests go through the shared rate
+    limiter at backfill priority, so live collection is served first.
+    Progress is checkpointed to a JSON file after every page, so an
+    interrupted run picks up where it stopped.
+    A pair that already holds candles (e.g. a few minutes written by the
+    live collector) is extended both ways: the range before its oldest
+    stored candle is paged into a staging series (`<pair>.backfill`, so it
+    resumes too) and then merged in front of the stored candles, and the
+    range after its newest one is appended.
+    Every write holds the series' inter-process lock (see SeriesLock), so
+    the CLI can run against the store of a live collector; candles the
+    collector appended in the meantime are never overwritten, and the
+    collector reseeds its in-memory cache when it sees the series changed.
+    """
+
+    def __init__(self, store=None, base_url=BINANCE_API_URL, workers=8,
+                 batch_size=MAX_KLINES_PER_REQUEST, checkpoint_path=None, limiter=None):
+        self.store = store or CandleStore()
+        self.limiter = limiter or rate_limiter
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.batch_size = min(batch_size, MAX_KLINES_PER_REQUEST)
+        self.checkpoint_path = checkpoint_path or os.path.join(self.store.root, "backfill_checkpoint.json")
+        self.checkpoint = self._load_checkpoint()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # requests.Session is not thread-safe; keep one per worker thread
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, int]]:
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[Backfill] Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return {}
+
+    def _save_checkpoint(self, key: str, next_start: int, end: int, head_end: Optional[int] = None):
+        with self._lock:
+            entry = {"next_start": next_start, "end": end}
+            if head_end is not None:
+                entry["head_end"] = head_end  # older range still being staged
+            self.checkpoint[key] = entry
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.checkpoint, f, indent=2)
+            os.replace(tmp_path, self.checkpoint_path)  # atomic on POSIX and Windows
+
+    def fetch_page(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> List[list]:
+        """Fetch up to `batch_size` klines opening in [start_ms, end_ms]."""
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": start_ms,
+            "endTime": end_ms,
+            "limit": self.batch_size,
+        }
+        response = self.limiter.request(self._session(), f"{self.base_url}/klines", weight=KLINES_WEIGHT,
+                                        priority=PRIORITY_BACKFILL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _pages(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        """Yield successive pages of closed klines opening in [start_ms, end_ms]."""
+        step = INTERVAL_MS[interval]
+        cursor = start_ms
+        while cursor <= end_ms:
+            rows = self.fetch_page(symbol, interval, cursor, end_ms)
+            # Only closed candles go into the store; the forming one is left to the live collector
+            now_ms = int(time.time() * 1000)
+            rows = [row for row in rows if int(row[6]) < now_ms and int(row[0]) >= cursor]
+            if not rows:
+                return
+            yield rows
+            cursor = int(rows[-1][0]) + step
+            if len(rows) < self.batch_size:
+                return
+
+    def _backfill_head(self, key: str, series: CandleSeries, symbol: str, interval: str,
+                       start_ms: int, head_end: int, end_ms: int) -> int:
+        """Stage [start_ms, head_end] in a fresh series, then merge it in front of `series`."""
+        step = INTERVAL_MS[interval]
+        staging_path = os.path.join(self.store.root, f"{key}.backfill")
+        staging = CandleSeries(staging_path, series.capacity)
+        if staging.last_timestamp is not None:
+            start_ms = max(start_ms, staging.last_timestamp + step)
+
+        for rows in self._pages(symbol, interval, start_ms, head_end):
+            staging.append_many(klines_to_records(rows))
+            staging.flush()
+            self._save_checkpoint(key, int(rows[-1][0]) + step, end_ms, head_end)
+
+        inserted = series.prepend(staging.last())
+        series.flush()
+        staging.remove()
+        self._save_checkpoint(key, (series.last_timestamp or head_end) + step, end_ms)
+        return inserted
+
+    def backfill_pair(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> int:
+        """Backfill one symbol/interval; returns the number of candles written."""
+        key = f"{symbol}_{interval}"
+        step = INTERVAL_MS[interval]
+        series = self.store.series(symbol, interval)
+        checkpoint = self.checkpoint.get(key, {})
+
+        written = 0
+        head_end = checkpoint.get("head_end")
+        if head_end is None and len(series) and len(series) < series.capacity:
+            oldest = int(series.last(len(series))["timestamp"][0])
+            if start_ms < oldest:
+                head_end = oldest - step
+        if head_end is not None:
+            written += self._backfill_head(key, series, symbol, interval, start_ms, head_end, end_ms)
+            checkpoint = self.checkpoint.get(key, {})
+
+        cursor = max(start_ms, checkpoint.get("next_start", start_ms))
+        if series.last_timestamp is not None:
+            cursor = max(cursor, series.last_timestamp + step)
+
+        for rows in self._pages(symbol, interval, cursor, end_ms):
+            records = klines_to_records(rows)
+            with series.lock:
+                # The live collector may have appended newer candles since the cursor was set
+                last_ts = series.last_timestamp
+                if last_ts is not None:
+                    records = records[records["timestamp"] > last_ts]
+                series.append_many(records)
+            written += len(records)
+            self._save_checkpoint(key, int(rows[-1][0]) + step, end_ms)
+
+        print(f"[Backfill] {symbol} {interval}: {written} candles written")
+        return written
+
+    def run(self, symbols: List[str], intervals: List[str], start_ms: int,
+            end_ms: Optional[int] = None) -> Dict[str, int]:
+        """Backfill every symbol x interval in parallel; returns candles written per pair."""
+        end_ms = end_ms or int(time.time() * 1000)
+        pairs = [(symbol, interval) for symbol in symbols for interval in intervals]
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self.backfill_pair, symbol, interval, start_ms, end_ms): f"{symbol}_{interval}"
+                for symbol, interval in pairs
+            }
+            for future, key in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    print(f"[Backfill] Error backfilling {key}: {e} (rerun to resume)")
+                    results[key] = 0
+
+        self.store.flush()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical candles into the candle store.")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--intervals", nargs="+", default=["1m", "5m"])
+    parser.add_argument("--days", type=float, default=30, help="How far back to start")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--store-dir", default=CANDLE_STORE_DIR)
+    parser.add_argument("--base-url", default=BINANCE_API_URL)
+    args = parser.parse_args()
+
+    start_ms = int((time.time() - args.days * 86400) * 1000)
+    backfiller = Backfiller(CandleStore(args.store_dir), base_url=args.base_url, workers=args.workers)
+    started = time.perf_counter()
+    results = backfiller.run(args.symbols, args.intervals, start_ms)
+    print(f"[Backfill] Done: {sum(results.values())} candles in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import threading
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+from config import CANDLE_CACHE_SIZE
+from app.candle_store import CANDLE_DTYPE, MirroredRing, candle_to_record, records_to_frame
+
+
+class CandleRingBuffer(MirroredRing):
+    """
+    Preallocated in-memory ring of candle records for one symbol/interval.
+    Same mirrored layout as CandleSeries, so `last(n)` is an O(1) view.
+    """
+
+    def __init__(self, capacity: int = CANDLE_CACHE_SIZE):
+        self.capacity = capacity
+        self._records = np.zeros(2 * capacity, dtype=CANDLE_DTYPE)
+        self._count = 0
+
+    def _get_count(self) -> int:
+        return self._count
+
+    def _set_count(self, count: int) -> None:
+        self._count = count
+
+
+class CandleCache:
+    """
+    Process-wide cache of recent candles, one CandleRingBuffer per
+    (symbol, interval). Filled by the Collector; read by indicator and
+    pattern code without touching disk or parsing CSV.
+    """
+
+    def __init__(self, capacity: int = CANDLE_CACHE_SIZE):
+        self.capacity = capacity
+        self._buffers: Dict[Tuple[str, str], CandleRingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, symbol: str, interval: str, seed: Optional[np.ndarray] = None) -> CandleRingBuffer:
+        """Get (or create) the ring for a pair; `seed` prefills a new ring, e.g. from the store."""
+        key = (symbol, interval)
+        buf = self._buffers.get(key)
+        if buf is None:
+            with self._lock:
+                buf = self._buffers.get(key)
+                if buf is None:
+                    buf = CandleRingBuffer(self.capacity)
+                    if seed is not None and len(seed):
+                        buf.append_many(seed)
+                    self._buffers[key] = buf
+        return buf
+
+    def reset(self, symbol: str, interval: str, seed: Optional[np.ndarray] = None) -> CandleRingBuffer:
+        """Replace a pair's ring with a fresh one prefilled from `seed` (e.g. after a backfill)."""
+        buf = CandleRingBuffer(self.capacity)
+        if seed is not None and len(seed):
+            buf.append_many(seed)
+        with self._lock:
+            self._buffers[(symbol, interval)] = buf
+        return buf
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._buffers
+
+    def append(self, symbol: str, interval: str, candle: Dict[str, Any]) -> None:
+        self.buffer(symbol, interval).append(candle_to_record(candle))
+
+    def upsert(self, symbol: str, interval: str, candle: Dict[str, Any]) -> str:
+        return self.buffer(symbol, interval).upsert(candle_to_record(candle))
+
+    def last(self, symbol: str, interval: str, n: Optional[int] = None) -> np.ndarray:
+        """O(1) view of the newest `n` bars (empty array if the pair is not cached)."""
+        buf = self._buffers.get((symbol, interval))
+        if buf is None:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return buf.last(n)
+
+    def frame(self, symbol: str, interval: str, n: Optional[int] = None):
+        """Newest `n` bars as an OHLCV DataFrame for pandas-based callers."""
+        return records_to_frame(self.last(symbol, interval, n))
+
+
+# Shared by every module in the process
+candle_cache = CandleCache()
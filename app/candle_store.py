@@ -0,0 +1,380 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+from config import CANDLE_STORE_DIR, CANDLE_STORE_RETENTION
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# One fixed-width record per candle; timestamp is the candle open time in epoch ms
+CANDLE_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+# Kline interval lengths in milliseconds (Binance interval names)
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+
+def normalize_interval(timeframe) -> str:
+    """Map legacy minute counts ("15", "60", "240") to interval names ("15m", "1h", "4h")."""
+    timeframe = str(timeframe)
+    if not timeframe.isdigit():
+        return timeframe
+    minutes = int(timeframe)
+    if minutes % 1440 == 0:
+        return f"{minutes // 1440}d"
+    if minutes % 60 == 0:
+        return f"{minutes // 60}h"
+    return f"{minutes}m"
+
+
+MAGIC = 0x314C444E4143  # "CANDL1" little-endian
+HEADER_SLOTS = 8         # int64 header words: magic, capacity, count, version, reserved...
+HEADER_BYTES = HEADER_SLOTS * 8
+_MAGIC, _CAPACITY, _COUNT, _VERSION = 0, 1, 2, 3
+
+
+def _lock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK gives up after ~10 s; keep waiting like flock does
+
+
+def _unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class SeriesLock:
+    """
+    Exclusive, re-entrant lock on one series file, held across threads and
+    processes (flock on POSIX, msvcrt.locking on Windows) via a `.lock`
+    file next to it. Every CandleSeries write takes it, so the live
+    collector and a `python -m app.backfill` run can share a store.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "SeriesLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                _lock_file(self._fd)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._fd)
+        self._thread_lock.release()
+
+    def close(self) -> None:
+        with self._thread_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def candle_to_record(candle: Dict[str, Any]) -> tuple:
+    """Convert a collector candle dict into a CANDLE_DTYPE tuple."""
+    ts = candle["timestamp"]
+    if not isinstance(ts, (int, np.integer)):
+        ts = pd.Timestamp(ts).value // 1_000_000
+    return (int(ts), float(candle["open"]), float(candle["high"]),
+            float(candle["low"]), float(candle["close"]), float(candle["volume"]))
+
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """Build an OHLCV DataFrame (same columns as the legacy CSVs) from store records."""
+    df = pd.DataFrame({name: records[name] for name in CANDLE_DTYPE.names})
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+    return df
+
+
+class MirroredRing:
+    """
+    Ring of CANDLE_DTYPE records with a mirrored layout: every record is
+    written to slot i and slot i + capacity, so the newest `n <= capacity`
+    records are always one contiguous slice and can be handed out as a
+    zero-copy view. Subclasses provide the backing array and the count.
+    """
+
+    capacity: int
+    _records: np.ndarray
+
+    def _get_count(self) -> int:
+        raise NotImplementedError
+
+    def _set_count(self, count: int) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return min(self._get_count(), self.capacity)
+
+    @property
+    def total_appended(self) -> int:
+        """Number of candles ever appended (including ones rotated out)."""
+        return self._get_count()
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Open time (epoch ms) of the newest record, or None if empty."""
+        latest = self.last(1)
+        return int(latest["timestamp"][0]) if len(latest) else None
+
+    def _write(self, slot: int, record) -> None:
+        self._records[slot] = record
+        self._records[slot + self.capacity] = record
+
+    def append(self, record) -> None:
+        """Append one record in O(1)."""
+        count = self._get_count()
+        self._write(count % self.capacity, record)
+        self._set_count(count + 1)  # published last so a crash/reader never sees a half-written bar
+
+    def append_many(self, records: np.ndarray) -> None:
+        """Append a batch of CANDLE_DTYPE records."""
+        records = np.asarray(records, dtype=CANDLE_DTYPE)[-self.capacity:]
+        count = self._get_count()
+        slots = (count + np.arange(len(records))) % self.capacity
+        self._records[slots] = records
+        self._records[slots + self.capacity] = records
+        self._set_count(count + len(records))
+
+    def upsert(self, record) -> str:
+        """
+        Write a record keyed on its open time: a newer candle is appended,
+        a candle already held (e.g. the one still forming) is replaced in
+        place. Returns "appended", "replaced" or "skipped" (older than the
+        retained window).
+        """
+        record = np.array(record, dtype=CANDLE_DTYPE)
+        ts = int(record["timestamp"])
+        last_ts = self.last_timestamp
+        if last_ts is None or ts > last_ts:
+            self.append(record)
+            return "appended"
+
+        window = self.last()
+        idx = int(np.searchsorted(window["timestamp"], ts))
+        if idx >= len(window) or int(window["timestamp"][idx]) != ts:
+            return "skipped"
+        count = self._get_count()
+        self._write((count - len(window) + idx) % self.capacity, record)
+        return "replaced"
+
+    def prepend(self, records: np.ndarray) -> int:
+        """
+        Insert candles older than the oldest retained one (e.g. a backfill
+        reaching further back than the live data). Only as many of the
+        newest as fit in the free capacity are kept. Returns how many were
+        inserted. The retained records are rewritten in place; a lock-free
+        reader may briefly see a mix of the old and new window.
+        """
+        records = np.asarray(records, dtype=CANDLE_DTYPE)
+        window = self.last().copy()
+        if len(window):
+            records = records[records["timestamp"] < window["timestamp"][0]]
+        room = self.capacity - len(window)
+        records = records[len(records) - min(room, len(records)):]
+        if not len(records):
+            return 0
+
+        merged = np.concatenate([records, window])
+        count = self._get_count() + len(records)
+        slots = (count - len(merged) + np.arange(len(merged))) % self.capacity
+        self._records[slots] = merged
+        self._records[slots + self.capacity] = merged
+        self._set_count(count)
+        return len(records)
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy view of the newest `n` records (all retained records if None)."""
+        count = self._get_count()
+        available = min(count, self.capacity)
+        n = available if n is None else max(0, min(n, available))
+        end = count % self.capacity + self.capacity
+        return self._records[end - n:end]
+
+
+class CandleSeries(MirroredRing):
+    """
+    Append-only ring file for one symbol/interval.
+
+    The file holds a small int64 header followed by 2 x capacity mirrored
+    records. The count in the header is bumped only after a record is
+    written, so a crash mid-append never exposes a half-written candle.
+    Writes hold `lock` (see SeriesLock) and bump `version`, so a process
+    can tell when another one has changed the series. Reads take no lock.
+    """
+
+    def __init__(self, path: str, capacity: int = CANDLE_STORE_RETENTION):
+        self.path = path
+        if os.path.exists(path):
+            header = np.memmap(path, dtype="<i8", mode="r", shape=(HEADER_SLOTS,))
+            if int(header[_MAGIC]) != MAGIC:
+                raise ValueError(f"{path} is not a candle store file")
+            capacity = int(header[_CAPACITY])
+            del header
+            mode = "r+"
+        else:
+            mode = "w+"
+
+        self.capacity = capacity
+        self._header = np.memmap(path, dtype="<i8", mode=mode, shape=(HEADER_SLOTS,))
+        if mode == "w+":
+            self._header[_MAGIC] = MAGIC
+            self._header[_CAPACITY] = capacity
+            self._header[_COUNT] = 0
+            self._header.flush()
+        self._records = np.memmap(path, dtype=CANDLE_DTYPE, mode="r+",
+                                  offset=HEADER_BYTES, shape=(2 * capacity,))
+        self.lock = SeriesLock(f"{path}.lock")
+
+    def _get_count(self) -> int:
+        return int(self._header[_COUNT])
+
+    def _set_count(self, count: int) -> None:
+        self._header[_COUNT] = count
+
+    @property
+    def version(self) -> int:
+        """Write counter shared by every process that has the file open."""
+        return int(self._header[_VERSION])
+
+    def _bump_version(self) -> None:
+        self._header[_VERSION] += 1
+
+    def append(self, record) -> None:
+        with self.lock:
+            super().append(record)
+            self._bump_version()
+
+    def append_many(self, records: np.ndarray) -> None:
+        with self.lock:
+            super().append_many(records)
+            self._bump_version()
+
+    def upsert(self, record) -> str:
+        with self.lock:
+            result = super().upsert(record)
+            self._bump_version()
+            return result
+
+    def prepend(self, records: np.ndarray) -> int:
+        with self.lock:
+            inserted = super().prepend(records)
+            self._bump_version()
+            return inserted
+
+    def flush(self) -> None:
+        self._records.flush()
+        self._header.flush()
+
+    def remove(self) -> None:
+        """Close the series and delete its file and lock file (e.g. a finished staging series)."""
+        self.lock.close()
+        del self._records, self._header
+        os.remove(self.path)
+        if os.path.exists(self.lock.path):
+            os.remove(self.lock.path)
+
+
+class CandleStore:
+    """
+    Storage engine for candle history: one CandleSeries file per
+    symbol/interval under `root`, opened lazily and kept open.
+    """
+
+    def __init__(self, root: str = CANDLE_STORE_DIR, retention: int = CANDLE_STORE_RETENTION):
+        self.root = root
+        self.retention = retention
+        self._series: Dict[str, CandleSeries] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def series(self, symbol: str, interval: str) -> CandleSeries:
+        key = f"{symbol}_{interval}"
+        if key not in self._series:
+            with self._lock:  # collector jobs open series from several threads
+                if key not in self._series:
+                    path = os.path.join(self.root, f"{key}.candles")
+                    self._series[key] = CandleSeries(path, self.retention)
+        return self._series[key]
+
+    def exists(self, symbol: str, interval: str) -> bool:
+        return os.path.exists(os.path.join(self.root, f"{symbol}_{interval}.candles"))
+
+    def append(self, symbol: str, interval: str, candle: Dict[str, Any]) -> None:
+        self.series(symbol, interval).append(candle_to_record(candle))
+
+    def upsert(self, symbol: str, interval: str, candle: Dict[str, Any]) -> str:
+        """Insert or replace a candle keyed on its open time (see MirroredRing.upsert)."""
+        return self.series(symbol, interval).upsert(candle_to_record(candle))
+
+    def read(self, symbol: str, interval: str, n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy structured view of the newest `n` candles."""
+        if not self.exists(symbol, interval):
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return self.series(symbol, interval).last(n)
+
+    def read_frame(self, symbol: str, interval: str, n: Optional[int] = None) -> pd.DataFrame:
+        """Newest `n` candles as an OHLCV DataFrame (for pandas-based analysis code)."""
+        return records_to_frame(self.read(symbol, interval, n))
+
+    def import_csv(self, symbol: str, interval: str, path: str) -> int:
+        """Load a legacy `{symbol}_{interval}.csv` file into the store."""
+        df = pd.read_csv(path, parse_dates=["timestamp"])
+        records = np.empty(len(df), dtype=CANDLE_DTYPE)
+        records["timestamp"] = df["timestamp"].astype("datetime64[ms]").astype("int64")
+        for column in ("open", "high", "low", "close", "volume"):
+            records[column] = df[column].to_numpy(dtype="float64")
+        self.series(symbol, interval).append_many(records)
+        return len(records)
+
+    def flush(self) -> None:
+        for series in self._series.values():
+            series.flush()
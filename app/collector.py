@@ -1,115 +1,344 @@
+import asyncio
 import time
-import os
 import pandas as pd
 import requests
+from config import COLLECTOR_CONFIG, CANDLE_STORE_DIR, CANDLE_STORE_RETENTION
+from app.candle_store import CandleStore, INTERVAL_MS, candle_to_record
+from app.candle_cache import candle_cache
+from app.symbol_index import ExchangeMetadata, SymbolIndex
+from app.price_snapshot import PriceSnapshot
+from app.scheduler import IntervalScheduler, next_boundary
+from app.rate_limiter import rate_limiter, PRIORITY_LIVE, BAN_STATUSES
+from app.resampler import Resampler, DEFAULT_TIMEFRAMES, BASE_INTERVAL
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+BINANCE_API_URL = "https://api.binance.com/api/v3"
+MAX_KLINES_PER_REQUEST = 1000  # Binance /klines hard limit
+KLINES_WEIGHT = 2              # request weight of one /klines call
 
 class Collector:
     """
     Collects live crypto price data from Binance public API
-    and saves rolling candle data into CSV files.
+    and appends candles to the binary candle store.
     Also supports dynamic symbol lookup for chatbot queries.
+
+    Candles can be collected by an interval-aligned scheduler (`start`) or
+    concurrently over a single keep-alive session (`start_async`).
+    Higher timeframes listed in `derived_intervals` are not fetched: they
+    are resampled from the closed 1m candles.
     """
-    def __init__(self, shared_state=None, symbols=None, intervals=None, data_dir="data"):
+    def __init__(self, shared_state=None, symbols=None, intervals=None, data_dir=CANDLE_STORE_DIR,
+                 base_url=BINANCE_API_URL, concurrency=20, poll_interval=60,
+                 retention=CANDLE_STORE_RETENTION, cache=None, settle_delay=1.0, spread=5.0,
+                 limiter=None, derived_intervals=DEFAULT_TIMEFRAMES):
         self.shared_state = shared_state or {}
         self.symbols = symbols or ["BTCUSDT", "ETHUSDT"]   # default pairs
-        self.intervals = intervals or ["1m", "5m"]          # default timeframes
+        self.intervals = intervals or [BASE_INTERVAL]       # timeframes fetched from the exchange
+        self.derived_intervals = [i for i in (derived_intervals or []) if i not in self.intervals]
         self.data_dir = data_dir
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency                      # max in-flight requests (async mode)
+        self.poll_interval = poll_interval                  # seconds between boundary-aligned cycles (async mode)
+        self.settle_delay = settle_delay                    # seconds after a candle boundary before fetching
+        self.spread = spread                                # seconds over which scheduled jobs are staggered
+        self.scheduler = None
         self.running = False
-        self.all_symbols = self.fetch_all_symbols()
+        self.session = requests.Session()                   # reuse connections across calls
+        self.limiter = limiter or rate_limiter              # request weight shared with every API caller
+        self.store = CandleStore(self.data_dir, retention)
+        self.cache = cache if cache is not None else candle_cache
+        self._store_versions = {}  # (symbol, interval) -> series version after our last write
+        self.metadata = ExchangeMetadata(self.base_url, session=self.session, limiter=self.limiter)
+        self._symbol_index = None  # built on first lookup, rebuilt when the metadata reloads
+        self._indexed_symbols = None
+        self.prices = PriceSnapshot(self.base_url, session=self.session, limiter=self.limiter)
+        self.resampler = None
+        if BASE_INTERVAL in self.intervals and self.derived_intervals:
+            self.resampler = Resampler(self.derived_intervals)
+        self._resampler_seeded = set()
 
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+    @property
+    def symbol_index(self) -> SymbolIndex:
+        symbols = self.metadata.symbols()
+        if self._symbol_index is None or symbols is not self._indexed_symbols:
+            self._symbol_index = SymbolIndex(symbols)
+            self._indexed_symbols = symbols
+        return self._symbol_index
+
+    @property
+    def all_symbols(self):
+        return self.symbol_index.symbols
 
     def fetch_all_symbols(self):
-        """Fetch all tradable USDT pairs dynamically from Binance."""
-        try:
-            url = "https://api.binance.com/api/v3/exchangeInfo"
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            symbols = [s["symbol"] for s in data["symbols"] if s["quoteAsset"] == "USDT"]
-            return symbols
-        except Exception as e:
-            print(f"[Collector] Error fetching symbol list: {e}")
-            return []
+        """Fetch all tradable USDT pairs (from the on-disk metadata cache when fresh)."""
+        return self.all_symbols
 
     def fetch_candle(self, symbol, interval):
         """Fetch latest kline (candle) for a given symbol + interval."""
-        url = "https://api.binance.com/api/v3/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": 1}
+        candles = self.fetch_candles(symbol, interval, limit=1)
+        return candles[-1] if candles else None
+
+    def fetch_candles(self, symbol, interval, limit=2, start_ms=None, end_ms=None):
+        """
+        Fetch recent klines, oldest first. The default limit=2 also returns
+        the previous candle, so its final (closed) values replace the last
+        partial copy that was polled while it was still forming.
+        """
+        url = f"{self.base_url}/klines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_ms is not None:
+            params["startTime"] = start_ms
+        if end_ms is not None:
+            params["endTime"] = end_ms
         try:
-            response = requests.get(url, params=params, timeout=5)
+            response = self.limiter.request(self.session, url, weight=KLINES_WEIGHT, priority=PRIORITY_LIVE,
+                                            params=params, timeout=5)
             response.raise_for_status()
-            data = response.json()[0]
-            candle = {
-                "timestamp": pd.to_datetime(data[0], unit="ms"),
-                "open": float(data[1]),
-                "high": float(data[2]),
-                "low": float(data[3]),
-                "close": float(data[4]),
-                "volume": float(data[5]),
-            }
-            return candle
+            return self.parse_klines(response.json())
         except Exception as e:
             print(f"[Collector] Error fetching {symbol} {interval}: {e}")
-            return None
+            return []
+
+    @staticmethod
+    def parse_kline(data, closed=False):
+        """Convert a raw Binance kline row into a candle dict."""
+        return {
+            "timestamp": pd.to_datetime(data[0], unit="ms"),
+            "open": float(data[1]),
+            "high": float(data[2]),
+            "low": float(data[3]),
+            "close": float(data[4]),
+            "volume": float(data[5]),
+            "closed": closed,
+        }
+
+    @classmethod
+    def parse_klines(cls, rows):
+        """
+        Convert a /klines response, oldest first. Every row but the newest
+        is final, since the exchange has already opened a later candle; the
+        newest may still be forming. This is decided from the response
+        alone, never from the local clock, which may run ahead of the
+        exchange's.
+        """
+        return [cls.parse_kline(row, closed=i < len(rows) - 1) for i, row in enumerate(rows)]
+
+    def save_candle(self, symbol, interval, candle, repair=True):
+        """
+        Upsert a candle, keyed on its open time, into the store and the
+        in-memory cache. A newer candle is appended; the candle that is
+        still forming is replaced in place. Missing candles between the
+        last stored one and this one are fetched first, unless `repair`
+        is False (no network calls, e.g. when replaying a recording).
+        """
+        if repair:
+            self.repair_gap(symbol, interval, candle)
+        result = self._write(symbol, interval, candle)
 
-    def save_candle(self, symbol, interval, candle):
-        """Save new candle into CSV (rolling window of last 200 rows)."""
-        file_path = os.path.join(self.data_dir, f"{symbol}_{interval}.csv")
+        if result == "appended":
+            print(f"[Collector] Saved {symbol} {interval} candle: {candle['close']}")
 
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path, parse_dates=["timestamp"])
+    async def save_candle_async(self, symbol, interval, candle):
+        """
+        `save_candle` for callers on the event loop. A gap repair makes
+        blocking kline requests under the rate limiter, so it runs in a
+        worker thread and the loop keeps serving other tasks (websocket
+        pings, the other pairs of a cycle) meanwhile.
+        """
+        if self._gap(symbol, interval, candle) is None:
+            self.save_candle(symbol, interval, candle)
         else:
-            df = pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume"])
+            await asyncio.get_running_loop().run_in_executor(None, self.save_candle, symbol, interval, candle)
+
+    async def save_candles_async(self, symbol, interval, candles):
+        for candle in candles:
+            await self.save_candle_async(symbol, interval, candle)
+
+    def _write(self, symbol, interval, candle) -> str:
+        """Upsert into store and cache; closed 1m candles also feed the resampler."""
+        series = self.store.series(symbol, interval)
+        with series.lock:  # a backfill in another process may write the same series
+            if self._store_versions.get((symbol, interval)) != series.version:
+                # First write, or the series changed under us (e.g. a backfill merged in
+                # older history): reseed the ring so readers get full, current windows
+                self.cache.reset(symbol, interval, seed=series.last(self.cache.capacity))
+            result = series.upsert(candle_to_record(candle))
+            self.cache.upsert(symbol, interval, candle)
+            self._store_versions[(symbol, interval)] = series.version
 
-        df = pd.concat([df, pd.DataFrame([candle])], ignore_index=True)
-        df = df.tail(200)  # keep last 200 rows
-        df.to_csv(file_path, index=False)
+        if self.resampler and interval == BASE_INTERVAL and candle.get("closed"):
+            self._resample(symbol, candle)
+        return result
 
-        print(f"[Collector] Saved {symbol} {interval} candle: {candle['close']}")
+    def _resample(self, symbol, candle):
+        if symbol not in self._resampler_seeded:
+            # Rebuild partial higher-timeframe bars from minutes stored before a restart
+            ts = candle_to_record(candle)[0]
+            history = self.store.read(symbol, BASE_INTERVAL, INTERVAL_MS["1d"] // INTERVAL_MS[BASE_INTERVAL])
+            self.resampler.seed(symbol, history[history["timestamp"] < ts])
+            self._resampler_seeded.add(symbol)
+
+        for timeframe, bar in self.resampler.add(symbol, candle):
+            bar["closed"] = True
+            self._write(symbol, timeframe, bar)
+            self.shared_state[f"{symbol}_{timeframe}"] = bar
+            print(f"[Collector] Resampled {symbol} {timeframe} candle: {bar['close']}")
+
+    def _gap(self, symbol, interval, candle):
+        """(first missing open time, open time of `candle`) if candles are missing before it, else None."""
+        step = INTERVAL_MS.get(interval)
+        last_ts = self.store.series(symbol, interval).last_timestamp
+        ts = candle_to_record(candle)[0]
+        if step is None or last_ts is None or ts - last_ts <= step:
+            return None
+        return last_ts + step, ts
+
+    def repair_gap(self, symbol, interval, candle) -> int:
+        """Fill any missing candles before `candle` with batch kline requests."""
+        gap = self._gap(symbol, interval, candle)
+        if gap is None:
+            return 0
+
+        step = INTERVAL_MS[interval]
+        cursor, ts = gap
+        filled = 0
+        while cursor < ts:
+            missing = self.fetch_candles(symbol, interval, limit=MAX_KLINES_PER_REQUEST,
+                                         start_ms=cursor, end_ms=ts - 1)
+            if not missing:
+                break
+            for gap_candle in missing:
+                gap_candle["closed"] = True  # opens before `candle`, so it is final
+                self._write(symbol, interval, gap_candle)
+            filled += len(missing)
+            cursor = candle_to_record(missing[-1])[0] + step
+
+        print(f"[Collector] Repaired gap in {symbol} {interval}: {filled} candles")
+        return filled
 
     def get_price_info(self, query: str) -> str:
         """
         Extract symbol dynamically from query and return current price.
         Example: "btc price", "what is eth doing"
         """
-        query_lower = query.lower()
-        # Try to match any USDT symbol that starts with first 3 letters (e.g. btc, eth, xrp)
-        matched = [s for s in self.all_symbols if s.lower().startswith(query_lower[:3])]
+        symbol = self.symbol_index.resolve(query)
 
-        if not matched:
+        if not symbol:
             return "⚠️ Could not recognize any supported coin in your question."
 
-        symbol = matched[0]
-
         try:
-            url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            price = float(data["price"])
+            entry = self.prices.get(symbol)
+            if entry is None:
+                return f"❌ No price available for {symbol}."
+            price, _ = entry
             return f"💰 Current price of {symbol} is ${price:.4f}"
         except Exception as e:
             return f"❌ Error fetching price for {symbol}: {e}"
 
+    def collect(self, symbol, interval):
+        """Fetch and save the latest candles for one symbol/interval."""
+        candles = self.fetch_candles(symbol, interval)
+        for candle in candles:
+            self.save_candle(symbol, interval, candle)
+        if candles:
+            self.shared_state[f"{symbol}_{interval}"] = candles[-1]
+
     def start(self):
-        """Main loop: fetch and save candles continuously."""
+        """Main loop: each symbol/interval is fetched just after its candle closes."""
         self.running = True
         print("[Collector] Starting data collection...")
 
-        while self.running:
-            for symbol in self.symbols:
-                for interval in self.intervals:
-                    candle = self.fetch_candle(symbol, interval)
-                    if candle:
-                        self.save_candle(symbol, interval, candle)
-                        self.shared_state[f"{symbol}_{interval}"] = candle
+        self.scheduler = IntervalScheduler(workers=self.concurrency, settle=self.settle_delay, spread=self.spread)
+        for symbol in self.symbols:
+            for interval in self.intervals:
+                period = INTERVAL_MS.get(interval, self.poll_interval * 1000) / 1000
+                self.scheduler.add(f"{symbol}_{interval}",
+                                   period, lambda s=symbol, i=interval: self.collect(s, i))
+        self.scheduler.run()
+
+    async def fetch_candles_async(self, session, semaphore, symbol, interval, limit=2):
+        """
+        Async variant of `fetch_candles`; at most `concurrency` requests run
+        at once. A 429/418 is retried after the limiter's backoff, as
+        `WeightRateLimiter.request` does for the sync path.
+        """
+        url = f"{self.base_url}/klines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        async with semaphore:
+            try:
+                for attempt in range(self.limiter.max_retries + 1):
+                    await self.limiter.acquire_async(KLINES_WEIGHT, PRIORITY_LIVE)
+                    async with session.get(url, params=params) as response:
+                        self.limiter.update(response.status, response.headers)
+                        if response.status in BAN_STATUSES and attempt < self.limiter.max_retries:
+                            continue  # the next acquire waits out the backoff set by update
+                        response.raise_for_status()
+                        data = await response.json()
+                    return self.parse_klines(data)
+            except Exception as e:
+                print(f"[Collector] Error fetching {symbol} {interval}: {e}")
+                return []
+
+    async def collect_cycle_async(self, session, semaphore) -> float:
+        """
+        Fetch the latest candle for every symbol x interval concurrently,
+        save the results and return the cycle wall time in seconds.
+        """
+        started = time.perf_counter()
+        pairs = [(symbol, interval) for symbol in self.symbols for interval in self.intervals]
+        results = await asyncio.gather(
+            *(self.fetch_candles_async(session, semaphore, symbol, interval) for symbol, interval in pairs)
+        )
+
+        # Pairs are saved concurrently so one pair's gap repair does not hold up the rest
+        await asyncio.gather(
+            *(self.save_candles_async(symbol, interval, candles) for (symbol, interval), candles in zip(pairs, results))
+        )
+
+        collected = 0
+        for (symbol, interval), candles in zip(pairs, results):
+            if candles:
+                self.shared_state[f"{symbol}_{interval}"] = candles[-1]
+                collected += 1
+
+        elapsed = time.perf_counter() - started
+        self.shared_state["collector_cycle"] = {
+            "pairs": len(pairs),
+            "collected": collected,
+            "wall_time": elapsed,
+        }
+        print(f"[Collector] Cycle collected {collected}/{len(pairs)} candles in {elapsed:.2f}s")
+        return elapsed
 
-            time.sleep(60)  # wait until next minute
+    async def start_async(self):
+        """
+        Async main loop: all pairs are fetched concurrently over one pooled
+        session, once per `poll_interval`, `settle_delay` seconds after
+        each boundary of that grid.
+        """
+        self.running = True
+        print(f"[Collector] Starting async data collection (concurrency={self.concurrency})...")
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=5)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while self.running:
+                await self.collect_cycle_async(session, semaphore)
+                # Next cycle just after the next candle boundary (as IntervalScheduler does), so every
+                # cycle sees the candle that just closed in its final form
+                now = time.time()
+                due = next_boundary(now - self.settle_delay, self.poll_interval) + self.settle_delay
+                await asyncio.sleep(max(0.0, due - now))
 
     def stop(self):
         self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
         print("[Collector] Stopped.")
 
 
@@ -117,6 +346,28 @@ def run_collector(shared_state):
     """
     Entry point for main.py
     """
-    collector = Collector(shared_state)
+    collector = Collector(
+        shared_state,
+        symbols=COLLECTOR_CONFIG.get('symbols'),
+        intervals=COLLECTOR_CONFIG.get('intervals'),
+        derived_intervals=COLLECTOR_CONFIG.get('derived_intervals', DEFAULT_TIMEFRAMES),
+        concurrency=COLLECTOR_CONFIG.get('concurrency', 20),
+        poll_interval=COLLECTOR_CONFIG.get('poll_interval', 60),
+        settle_delay=COLLECTOR_CONFIG.get('settle_delay', 1.0),
+        spread=COLLECTOR_CONFIG.get('spread', 5.0),
+    )
+    if COLLECTOR_CONFIG.get('mode') == 'stream':
+        from app.stream import KlineStream, websockets
+        if websockets is None:
+            print("[Collector] websockets not installed. Falling back to sequential collection.")
+        else:
+            asyncio.run(KlineStream(collector, ws_url=COLLECTOR_CONFIG.get('ws_url')).run())
+            return
+    if COLLECTOR_CONFIG.get('mode') == 'async':
+        if aiohttp is None:
+            print("[Collector] aiohttp not installed. Falling back to sequential collection.")
+        else:
+            asyncio.run(collector.start_async())
+            return
     collector.start()
 
@@ -0,0 +1,160 @@
+import os
+import re
+import sys
+from typing import Tuple
+
+import joblib
+import numpy as np
+
+from app.model_registry import file_signature
+
+
+def _predict_proba_normalizes() -> bool:
+    """
+    Whether the installed sklearn's DecisionTreeClassifier.predict_proba
+    divides leaf values by their sum. From 1.4 on, trees store class
+    fractions and return them as they are, and dividing again changes the
+    last bit of some probabilities.
+    """
+    import sklearn
+
+    version = tuple(int(part) for part in re.findall(r"\d+", sklearn.__version__)[:2])
+    return version < (1, 4)
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous NumPy arrays.
+
+    All trees share one node table (feature, threshold, left, right and
+    per-class leaf probabilities, indexed by global node id). Leaves point
+    to themselves, so prediction is `depth` rounds of branch-free gathers
+    over a (rows x trees) array of node ids, with no sklearn validation or
+    per-tree dispatch. Inputs are rounded to float32, leaf values are
+    normalised only if the installed sklearn does so, and the tree
+    probabilities are summed in tree order, as sklearn does, so classes
+    and probabilities are identical to the original model.
+
+    Only plain arrays are stored, so a compiled model saved with joblib is
+    memory-mapped by the model registry instead of copied.
+
+    `source_signature` is the file_signature of the pickled forest it was
+    compiled from, so a consumer can tell a stale export from a current one.
+    """
+
+    def __init__(self, feature, threshold, missing_left, left, right, proba, roots, depth, classes,
+                 feature_names=None, source_signature=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.left = left
+        self.right = right
+        self.proba = proba
+        self.roots = roots
+        self.depth = depth
+        self.classes_ = classes
+        self.feature_names = feature_names
+        self.source_signature = source_signature
+        self.n_features_in_ = int(feature.max()) + 1 if len(feature) else 0
+
+    @classmethod
+    def from_sklearn(cls, model, source_signature=None) -> "CompiledForest":
+        """Compile a fitted RandomForestClassifier (single output)."""
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        normalize = _predict_proba_normalizes()
+        features, thresholds, missing, lefts, rights, probas, roots = [], [], [], [], [], [], []
+        offset, depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            # Where NaN inputs go at each split (sklearn >= 1.3; older versions reject NaN)
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool))
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+
+            value = tree.value[:, 0, :]
+            if normalize:
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            probas.append(value)
+
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            proba=np.ascontiguousarray(np.concatenate(probas), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth,
+            classes=np.asarray(model.classes_),
+            feature_names=getattr(model, "feature_names_in_", None),
+            source_signature=source_signature,
+        )
+
+    def _as_array(self, X) -> np.ndarray:
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[list(self.feature_names)]
+        X = np.asarray(X, dtype=np.float32)  # sklearn trees split on float32 inputs
+        if np.isinf(X).any():
+            raise ValueError("Input contains infinity")  # rejected by sklearn's validation too
+        return np.atleast_2d(X).astype(np.float64)
+
+    def leaves(self, X) -> np.ndarray:
+        """(rows x trees) global node id of the leaf each row reaches in each tree."""
+        X = self._as_array(X)
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        rows = np.arange(X.shape[0])[:, None]
+        for _ in range(self.depth):
+            value = X[rows, self.feature[node]]
+            go_left = (value <= self.threshold[node]) | (np.isnan(value) & self.missing_left[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_with_proba(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Class labels and class probabilities in one traversal."""
+        leaf_proba = self.proba[self.leaves(X)]  # rows x trees x classes
+        # Sequential sum over trees (cumsum, not pairwise) to match sklearn bit for bit
+        proba = np.cumsum(leaf_proba, axis=1)[:, -1] / len(self.roots)
+        return self.classes_.take(np.argmax(proba, axis=1)), proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.predict_with_proba(X)[1]
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_with_proba(X)[0]
+
+    def save(self, path: str) -> None:
+        """Atomically write the compiled model (uncompressed, so it can be memory-mapped)."""
+        joblib.dump(self, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+
+def compile_model_file(source: str, target: str) -> CompiledForest:
+    """Load a pickled forest from `source` and write its compiled form to `target`."""
+    compiled = CompiledForest.from_sklearn(joblib.load(source), source_signature=file_signature(source))
+    compiled.save(target)
+    print(f"[CompiledForest] {source} -> {target} ({len(compiled.roots)} trees, "
+          f"{len(compiled.feature)} nodes, depth {compiled.depth})")
+    return compiled
+
+
+if __name__ == "__main__":
+    # python -m app.compiled_forest [source.pkl target.pkl]  (default: the market model)
+    from config import MARKET_MODEL_PATH, MARKET_COMPILED_MODEL_PATH
+
+    if len(sys.argv) == 3:
+        compile_model_file(sys.argv[1], sys.argv[2])
+    else:
+        compile_model_file(MARKET_MODEL_PATH, MARKET_COMPILED_MODEL_PATH)
@@ -1,15 +1,386 @@
+import math
+import threading
+from collections import OrderedDict, deque
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from app import indicator_math as im
+from app.candle_store import CandleStore
+from app.indicator_history import IndicatorHistory, to_epoch_ms
+from config import INDICATOR_CACHE_MAX_BYTES
+
+
+class _RollingWindow:
+    """Fixed-length window keeping a running sum (and sum of squares) in O(1) per update."""
+
+    def __init__(self, size: int, squares: bool = False):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.squares = squares
+        self.total_sq = 0.0
+        self.shift = None  # first value seen; squares are taken around it to limit cancellation
+
+    def push(self, value: float):
+        if self.squares and self.shift is None:
+            self.shift = value
+        self.values.append(value)
+        self.total += value
+        if self.squares:
+            self.total_sq += (value - self.shift) ** 2
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            if self.squares:
+                self.total_sq -= (old - self.shift) ** 2
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    def mean(self) -> float:
+        return self.total / self.size if self.full else math.nan
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), matching pandas rolling().std()."""
+        if not self.full:
+            return math.nan
+        n = self.size
+        shifted_sum = self.total - n * self.shift
+        var = (self.total_sq - shifted_sum * shifted_sum / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class StreamingIndicators:
+    """
+    Running indicator state for one symbol/interval.
+
+    Each `update` folds in a single candle in constant time and returns the
+    same values as the last row of `IndicatorEngine.calculate_indicators`
+    over the full history (EMA accumulators, rolling gain/loss and true
+    range sums, rolling sum and sum of squares for the Bollinger Bands).
+    """
+
+    def __init__(self, ema_periods=(20, 50), rsi_period=14, macd=(12, 26, 9),
+                 bb_period=20, bb_std=2, atr_period=14):
+        self.ema_periods = ema_periods
+        self.macd_fast, self.macd_slow, self.macd_signal = macd
+        self.bb_std = bb_std
+        self.ema: Dict[int, float] = {}
+        self.macd_signal_ema = None
+        self.gains = _RollingWindow(rsi_period)
+        self.losses = _RollingWindow(rsi_period)
+        self.true_ranges = _RollingWindow(atr_period)
+        self.closes = _RollingWindow(bb_period, squares=True)
+        self.prev_close = None
+        self.count = 0
+        self.last_timestamp = None  # epoch ms of the last candle folded in (set by sync_history)
+
+    def _ema(self, period: int, value: float) -> float:
+        # ewm(span=period, adjust=False): seeded with the first value
+        alpha = 2.0 / (period + 1)
+        prev = self.ema.get(period)
+        self.ema[period] = value if prev is None else alpha * value + (1 - alpha) * prev
+        return self.ema[period]
+
+    def update(self, candle: Dict[str, Any]) -> Dict[str, float]:
+        close, high, low = float(candle['close']), float(candle['high']), float(candle['low'])
+
+        for period in set(self.ema_periods) | {self.macd_fast, self.macd_slow}:
+            self._ema(period, close)
+
+        macd_line = self.ema[self.macd_fast] - self.ema[self.macd_slow]
+        alpha = 2.0 / (self.macd_signal + 1)
+        if self.macd_signal_ema is None:
+            self.macd_signal_ema = macd_line
+        else:
+            self.macd_signal_ema = alpha * macd_line + (1 - alpha) * self.macd_signal_ema
+
+        # The first candle has no previous close: pandas treats its change as 0
+        # for RSI and its true range as high - low
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.gains.push(max(delta, 0.0))
+        self.losses.push(max(-delta, 0.0))
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.true_ranges.push(true_range)
+        self.closes.push(close)
+        self.prev_close = close
+        self.count += 1
+
+        return self.current(macd_line)
+
+    def current(self, macd_line: float = None) -> Dict[str, float]:
+        if self.count == 0:
+            return {}
+        if macd_line is None:
+            macd_line = self.ema[self.macd_fast] - self.ema[self.macd_slow]
+
+        gain, loss = self.gains.mean(), self.losses.mean()
+        if math.isnan(gain) or (gain == 0 and loss == 0):
+            rsi = math.nan
+        elif loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + gain / loss)
+
+        sma, std = self.closes.mean(), self.closes.std()
+        values = {f'ema_{period}': self.ema[period] for period in self.ema_periods}
+        values.update({
+            'rsi': rsi,
+            'macd_line': macd_line,
+            'signal_line': self.macd_signal_ema,
+            'histogram': macd_line - self.macd_signal_ema,
+            'sma': sma,
+            'upper_band': sma + std * self.bb_std,
+            'lower_band': sma - std * self.bb_std,
+            'atr': self.true_ranges.mean(),
+        })
+        return values
+
+
+SOURCE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Indicators returned by calculate_indicators() when no names are requested
+DEFAULT_INDICATORS = ('ema_20', 'ema_50', 'rsi', 'macd_line', 'signal_line', 'histogram',
+                      'sma', 'upper_band', 'lower_band', 'atr')
+
+# name -> (dependencies, function of the dependency arrays)
+INDICATOR_NODES = {
+    'delta': (('close',), im.diff),
+    'avg_gain': (('delta',), lambda delta: im.rolling_mean(np.maximum(delta, 0), 14)),
+    'avg_loss': (('delta',), lambda delta: im.rolling_mean(np.maximum(-delta, 0), 14)),
+    'rsi': (('avg_gain', 'avg_loss'), im.rsi_from_means),
+    'macd_line': (('ema_12', 'ema_26'), np.subtract),
+    'signal_line': (('macd_line',), lambda macd: im.ema(macd, 9)),
+    'histogram': (('macd_line', 'signal_line'), np.subtract),
+    'sma': (('close',), lambda close: im.rolling_mean(close, 20)),
+    'bb_std': (('close',), lambda close: im.rolling_std(close, 20)),
+    'upper_band': (('sma', 'bb_std'), lambda sma, std: sma + std * 2),
+    'lower_band': (('sma', 'bb_std'), lambda sma, std: sma - std * 2),
+    'true_range': (('high', 'low', 'close'), im.true_range),
+    'atr': (('true_range',), lambda tr: im.rolling_mean(tr, 14)),
+    # Extended set (not in DEFAULT_INDICATORS; request them by name)
+    'rsi_wilder': (('close',), im.rsi_wilder),
+    'stochastic': (('high', 'low', 'close'), im.stochastic),
+    'stoch_k': (('stochastic',), lambda stoch: stoch[0]),
+    'stoch_d': (('stochastic',), lambda stoch: stoch[1]),
+    'dmi': (('high', 'low', 'close'), im.dmi),
+    'plus_di': (('dmi',), lambda dmi: dmi[0]),
+    'minus_di': (('dmi',), lambda dmi: dmi[1]),
+    'adx': (('dmi',), lambda dmi: dmi[2]),
+    'vwap': (('high', 'low', 'close', 'volume'), im.vwap),
+    'obv': (('close', 'volume'), im.obv),
+    'keltner_atr': (('true_range',), lambda tr: im.wilder(tr, 10)),
+    'keltner_upper': (('ema_20', 'keltner_atr'), lambda middle, atr: middle + atr * 2),
+    'keltner_lower': (('ema_20', 'keltner_atr'), lambda middle, atr: middle - atr * 2),
+    'tenkan_sen': (('high', 'low'), lambda high, low: im.midpoint(high, low, 9)),
+    'kijun_sen': (('high', 'low'), lambda high, low: im.midpoint(high, low, 26)),
+    'senkou_span_a': (('tenkan_sen', 'kijun_sen'), lambda tenkan, kijun: im.shift((tenkan + kijun) / 2, 26)),
+    'senkou_span_b': (('high', 'low'), lambda high, low: im.shift(im.midpoint(high, low, 52), 26)),
+    'chikou_span': (('close',), lambda close: im.shift(close, -26)),  # looks ahead; charting only
+}
+
+
+class IndicatorGraph:
+    """
+    Indicators declared as nodes with explicit dependencies.
+
+    `evaluate` walks the graph depth-first from the requested names and
+    memoises every node for the duration of the call, so e.g. MACD reuses
+    the EMAs and RSI/ATR share nothing they do not need. `ema_<n>` nodes
+    are created on demand for any span.
+    """
+
+    def __init__(self, nodes=None):
+        self.nodes = dict(INDICATOR_NODES if nodes is None else nodes)
+
+    def node(self, name: str):
+        if name in self.nodes:
+            return self.nodes[name]
+        if name.startswith('ema_') and name[4:].isdigit():
+            span = int(name[4:])
+            return ('close',), lambda close: im.ema(close, span)
+        raise KeyError(f"Unknown indicator: {name}")
+
+    def evaluate(self, sources: Dict[str, np.ndarray], names) -> Dict[str, np.ndarray]:
+        memo = dict(sources)
+
+        def resolve(name):
+            if name not in memo:
+                deps, fn = self.node(name)
+                memo[name] = fn(*(resolve(dep) for dep in deps))
+            return memo[name]
+
+        return {name: resolve(name) for name in names}
+
+
+class IndicatorCache:
+    """
+    Bounded LRU cache of indicator results, evicted by memory size.
+
+    Keys identify the input series (symbol, interval, bar count, last
+    candle timestamp) and the parameter set, so a repeated read of an
+    unchanged series is a dict lookup. Cached results are shared between
+    callers and must not be mutated.
+    """
+
+    def __init__(self, max_bytes: int = INDICATOR_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        if isinstance(value, dict):
+            return sum(IndicatorCache._sizeof(v) for v in value.values())
+        if isinstance(value, (np.ndarray, pd.Series)):
+            return int(value.nbytes)
+        return 8
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
 
 class IndicatorEngine:
     """
     Calculates technical indicators from OHLCV data.
+
+    `calculate_indicators` recomputes everything over a DataFrame;
+    `update` keeps per-(symbol, interval) streaming state and folds in
+    one new candle in O(1); `calculate_indicators_batch` computes every
+    indicator for a whole (symbols x time) matrix at once. Both batch
+    paths evaluate through the IndicatorGraph, so only requested
+    indicators and their dependencies are computed.
     """
     
-    def __init__(self):
-        self.indicators_history = {}
+    def __init__(self, cache_bytes: int = INDICATOR_CACHE_MAX_BYTES, history: IndicatorHistory = None,
+                 store: CandleStore = None):
+        self.cache = IndicatorCache(cache_bytes)
+        self.history = history or IndicatorHistory()
+        self.store = store or CandleStore()  # candle history for rebuilding lost streaming state
+        self.graph = IndicatorGraph()
+        self.streams: Dict[Tuple[str, str], StreamingIndicators] = {}
+
+    def update(self, symbol: str, interval: str, candle: Dict[str, Any]) -> Dict[str, float]:
+        """Fold one closed candle into the streaming state; returns the current values."""
+        key = (symbol, interval)
+        if key not in self.streams:
+            self.streams[key] = StreamingIndicators()
+        return self.streams[key].update(candle)
+
+    @staticmethod
+    def _replay(df: pd.DataFrame, state: StreamingIndicators = None):
+        """Fold every row of `df` into a streaming state; returns (state, per-row values)."""
+        state = state or StreamingIndicators()
+        rows = [state.update({'close': close, 'high': high, 'low': low})
+                for close, high, low in zip(df['close'].to_numpy(), df['high'].to_numpy(),
+                                            df['low'].to_numpy())]
+        return state, rows
+
+    def warm_up(self, symbol: str, interval: str, df: pd.DataFrame) -> Dict[str, float]:
+        """Rebuild the streaming state for a pair from its candle history."""
+        state, _ = self._replay(df)
+        self.streams[(symbol, interval)] = state
+        return state.current()
+
+    def sync_history(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Persist indicators for the candles in `df` (with a 'timestamp'
+        column) that are newer than the stored history; returns the
+        number of rows appended. Only the new candles are processed: the
+        streaming state saved with the history is resumed, or rebuilt
+        from the candle store if it is missing or stale.
+        """
+        if df.empty:
+            return 0
+        timestamps = to_epoch_ms(df['timestamp'])
+        last = self.history.last_timestamp(symbol, interval)
+
+        if last is None:
+            # First sync: one vectorized pass over the whole series
+            values = self.evaluate(self._sources(df))
+            self.history.append(symbol, interval, timestamps, values)
+            state, _ = self._replay(df)
+            appended = len(df)
+        else:
+            state = self.history.load_state(symbol, interval)
+            if state is None or state.last_timestamp != last:
+                state = self._rebuild_state(symbol, interval, df, last)
+            new = df[timestamps > last]
+            if new.empty:
+                return 0
+            state, rows = self._replay(new, state)
+            columns = {name: np.array([row[name] for row in rows]) for name in DEFAULT_INDICATORS}
+            self.history.append(symbol, interval, timestamps[timestamps > last], columns)
+            appended = len(new)
+
+        state.last_timestamp = int(timestamps[-1])
+        self.history.save_state(symbol, interval, state)
+        self.streams[(symbol, interval)] = state
+        return appended
     
+    def _rebuild_state(self, symbol: str, interval: str, df: pd.DataFrame, last: int) -> StreamingIndicators:
+        """
+        Streaming state for a history whose saved state is lost or stale.
+        Every candle from the first history row to `last` is replayed (from
+        the candle store, plus `df`), so EMA/MACD continue exactly as a full
+        recompute would.
+        """
+        columns = ['close', 'high', 'low']
+        stored = self.store.read_frame(symbol, interval)
+        candles = pd.concat([stored[columns], df[columns]], ignore_index=True)
+        candles['ts'] = np.concatenate([to_epoch_ms(stored['timestamp']), to_epoch_ms(df['timestamp'])])
+        first = self.history.first_timestamp(symbol, interval)
+        candles = candles[(candles['ts'] >= first) & (candles['ts'] <= last)]
+        candles = candles.drop_duplicates('ts', keep='last').sort_values('ts')
+
+        rows = self.history.rows(symbol, interval)
+        if len(candles) != rows:
+            print(f"[IndicatorEngine] Rebuilding {symbol} {interval} state from {len(candles)} of {rows} "
+                  f"candles; EMA/MACD may differ from a full recompute until they converge")
+        state, _ = self._replay(candles)
+        return state
+
     def calculate_ema(self, df: pd.DataFrame, period: int = 20) -> pd.Series:
         """Calculate Exponential Moving Average."""
         return df['close'].ewm(span=period, adjust=False).mean()
@@ -60,33 +431,85 @@ class IndicatorEngine:
         atr = true_range.rolling(period).mean()
         return atr
     
-    def calculate_indicators(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Calculate all technical indicators."""
-        indicators = {}
-        
-        # Moving averages
-        indicators['ema_20'] = self.calculate_ema(df, 20)
-        indicators['ema_50'] = self.calculate_ema(df, 50)
-        
-        # Oscillators
-        indicators['rsi'] = self.calculate_rsi(df, 14)
-        
-        # MACD
-        macd_data = self.calculate_macd(df)
-        indicators.update(macd_data)
-        
-        # Bollinger Bands
-        bb_data = self.calculate_bollinger_bands(df)
-        indicators.update(bb_data)
-        
-        # Volatility
-        indicators['atr'] = self.calculate_atr(df)
-        
-        # Add current values
-        current_values = {}
-        for key, value in indicators.items():
-            if not value.empty:
-                current_values[key] = value.iloc[-1]
-        
-        indicators['current'] = current_values
+    def evaluate(self, sources: Dict[str, np.ndarray], names=None) -> Dict[str, np.ndarray]:
+        """
+        Evaluate only the requested indicators (all standard ones if None)
+        from raw 'close'/'high'/'low' arrays (1-D or symbols x time).
+        Shared intermediates are computed once.
+        """
+        return self.graph.evaluate(sources, names or DEFAULT_INDICATORS)
+
+    @staticmethod
+    def _sources(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        return {column: df[column].to_numpy(dtype='float64')
+                for column in SOURCE_COLUMNS if column in df.columns}
+
+    @staticmethod
+    def _cache_key(kind: str, df: pd.DataFrame, symbol, interval, names):
+        """
+        Cache key for a series, or None when the caller did not identify it.
+        The last bar's values are part of the key: the forming candle is
+        replaced in place (same length and open time) on every poll.
+        """
+        if symbol is None or interval is None or df.empty:
+            return None
+        last = df['timestamp'].iloc[-1] if 'timestamp' in df.columns else df.index[-1]
+        last_bar = tuple(float(df[column].iat[-1]) for column in SOURCE_COLUMNS if column in df.columns)
+        return (kind, symbol, interval, len(df), last, last_bar, tuple(names or DEFAULT_INDICATORS))
+
+    def calculate_current(self, df: pd.DataFrame, names=None, symbol: str = None,
+                          interval: str = None) -> Dict[str, float]:
+        """Latest value of each requested indicator, without building any Series."""
+        if df.empty:
+            return {}
+        key = self._cache_key('current', df, symbol, interval, names)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            return cached
+
+        values = self.evaluate(self._sources(df), names)
+        current = {name: value[-1] for name, value in values.items()}
+        if key:
+            self.cache.put(key, current)
+        return current
+
+    def calculate_indicators(self, df: pd.DataFrame, names=None, symbol: str = None,
+                             interval: str = None) -> Dict[str, Any]:
+        """
+        Calculate technical indicators (all standard ones unless `names` is given).
+        Pass `symbol` and `interval` to serve repeated reads of an unchanged
+        series from the engine's cache.
+        """
+        key = self._cache_key('series', df, symbol, interval, names)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            return cached
+
+        values = self.evaluate(self._sources(df), names)
+
+        indicators = {name: pd.Series(value, index=df.index) for name, value in values.items()}
+        indicators['current'] = {name: value[-1] for name, value in values.items() if len(value)}
+        if key:
+            self.cache.put(key, indicators)
+        return indicators
+
+    def calculate_indicators_batch(self, close: np.ndarray, high: np.ndarray,
+                                   low: np.ndarray, names=None, volume: np.ndarray = None) -> Dict[str, Any]:
+        """
+        Calculate indicators for many symbols at once.
+
+        Inputs are aligned (symbols x time) arrays (one row per symbol, same
+        bar count); `volume` is only needed for VWAP/OBV. Returns the same
+        keys as `calculate_indicators`, each a (symbols x time) array, plus
+        'current' mapping each key to the last column (one value per symbol).
+        """
+        sources = {
+            'close': np.atleast_2d(np.asarray(close, dtype='float64')),
+            'high': np.atleast_2d(np.asarray(high, dtype='float64')),
+            'low': np.atleast_2d(np.asarray(low, dtype='float64')),
+        }
+        if volume is not None:
+            sources['volume'] = np.atleast_2d(np.asarray(volume, dtype='float64'))
+        indicators = self.evaluate(sources, names)
+        indicators['current'] = {key: value[:, -1] for key, value in indicators.items()}
         return indicators
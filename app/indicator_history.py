@@ -0,0 +1,145 @@
+import os
+import pickle
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import INDICATOR_HISTORY_DIR
+
+TIMESTAMP_FILE = "timestamp.i64"
+STATE_FILE = "state.pkl"
+
+
+def to_epoch_ms(values) -> np.ndarray:
+    """Timestamps (datetime-like or epoch ms) as an int64 epoch-ms array."""
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy().astype("datetime64[ms]").astype("int64")
+    return values.to_numpy(dtype="int64")
+
+
+def _ms(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value // 1_000_000
+
+
+class IndicatorHistory:
+    """
+    Append-only columnar indicator history, one directory per symbol/interval.
+
+    Each column is a raw little-endian float64 file (`<name>.f64`) next to an
+    int64 `timestamp.i64`. Rows are committed by appending the timestamp
+    last, so the timestamp file length is the row count and any column
+    bytes past it (a crash mid-append) are ignored and trimmed. Reads
+    memory-map the files and slice a time range with a binary search on
+    the timestamps, so only the requested rows are touched.
+
+    The StreamingIndicators state is saved alongside, so
+    `IndicatorEngine.sync_history` only processes candles newer than the
+    last stored row.
+    """
+
+    def __init__(self, root: str = INDICATOR_HISTORY_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"{symbol}_{interval}")
+
+    def _path(self, symbol: str, interval: str, name: str) -> str:
+        return os.path.join(self._dir(symbol, interval), name)
+
+    def rows(self, symbol: str, interval: str) -> int:
+        path = self._path(symbol, interval, TIMESTAMP_FILE)
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def columns(self, symbol: str, interval: str) -> List[str]:
+        directory = self._dir(symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(f[:-4] for f in os.listdir(directory) if f.endswith(".f64"))
+
+    def first_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        if self.rows(symbol, interval) == 0:
+            return None
+        ts = np.memmap(self._path(symbol, interval, TIMESTAMP_FILE), dtype="<i8", mode="r", shape=(1,))
+        return int(ts[0])
+
+    def last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        rows = self.rows(symbol, interval)
+        if rows == 0:
+            return None
+        ts = np.memmap(self._path(symbol, interval, TIMESTAMP_FILE), dtype="<i8", mode="r")
+        return int(ts[rows - 1])
+
+    def append(self, symbol: str, interval: str, timestamps: np.ndarray,
+               columns: Dict[str, np.ndarray]) -> None:
+        """Append rows; `timestamps` are epoch ms and must be newer than the stored ones."""
+        timestamps = np.asarray(timestamps, dtype="<i8")
+        if len(timestamps) == 0:
+            return
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+        rows = self.rows(symbol, interval)
+        last = self.last_timestamp(symbol, interval)
+        if last is not None and timestamps[0] <= last:
+            raise ValueError(f"{symbol} {interval}: rows must be appended in time order")
+
+        for name, values in columns.items():
+            path = self._path(symbol, interval, f"{name}.f64")
+            if os.path.exists(path) and os.path.getsize(path) != rows * 8:
+                os.truncate(path, min(os.path.getsize(path), rows * 8))  # drop an uncommitted tail
+            if not os.path.exists(path) and rows:
+                np.full(rows, np.nan, dtype="<f8").tofile(path)  # new column: NaN for earlier rows
+            with open(path, "ab") as f:
+                np.asarray(values, dtype="<f8").tofile(f)
+
+        with open(self._path(symbol, interval, TIMESTAMP_FILE), "ab") as f:
+            timestamps.tofile(f)  # commit point
+
+    def read(self, symbol: str, interval: str, start=None, end=None,
+             names=None) -> Dict[str, np.ndarray]:
+        """
+        Memory-mapped views of rows with start <= timestamp <= end (either
+        bound optional), keyed by column name plus 'timestamp'.
+        """
+        rows = self.rows(symbol, interval)
+        if rows == 0:
+            return {}
+        ts = np.memmap(self._path(symbol, interval, TIMESTAMP_FILE), dtype="<i8", mode="r", shape=(rows,))
+        lo = int(np.searchsorted(ts, _ms(start), side="left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, _ms(end), side="right")) if end is not None else rows
+
+        result = {"timestamp": ts[lo:hi]}
+        for name in names or self.columns(symbol, interval):
+            path = self._path(symbol, interval, f"{name}.f64")
+            column = np.memmap(path, dtype="<f8", mode="r", shape=(rows,))
+            result[name] = column[lo:hi]
+        return result
+
+    def read_frame(self, symbol: str, interval: str, start=None, end=None, names=None) -> pd.DataFrame:
+        data = self.read(symbol, interval, start, end, names)
+        if not data:
+            return pd.DataFrame()
+        df = pd.DataFrame({k: np.asarray(v) for k, v in data.items()})
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+    def load_state(self, symbol: str, interval: str):
+        path = self._path(symbol, interval, STATE_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"[IndicatorHistory] Discarding unreadable state {path}: {e}")
+            return None
+
+    def save_state(self, symbol: str, interval: str, state) -> None:
+        path = self._path(symbol, interval, STATE_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, path)
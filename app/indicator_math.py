@@ -0,0 +1,199 @@
+# app/indicator_math.py
+# NumPy kernels shared by the indicator code. Every function works along the
+# last axis, so one call handles a single series (T,) or a whole symbol
+# universe (S, T). Values before a window is full are NaN, like pandas rolling().
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # scipy ships with scikit-learn, but keep a pure-NumPy path
+    lfilter = None
+
+
+def _recurrence(x: np.ndarray, alpha: float, first: np.ndarray) -> np.ndarray:
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1] along the last axis, with y[0] = first."""
+    if x.shape[-1] == 0:
+        return x.copy()
+    if lfilter is not None:
+        zi = (1 - alpha) * first[..., None]
+        out, _ = lfilter([alpha], [1.0, -(1 - alpha)], x[..., 1:], axis=-1, zi=zi)
+        return np.concatenate([first[..., None], out], axis=-1)
+    out = np.empty_like(x)
+    out[..., 0] = first
+    for t in range(1, x.shape[-1]):
+        out[..., t] = alpha * x[..., t] + (1 - alpha) * out[..., t - 1]
+    return out
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average, same as pandas ewm(span=span, adjust=False).mean()."""
+    x = np.asarray(x, dtype="float64")
+    return _recurrence(x, 2.0 / (span + 1), x[..., 0] if x.shape[-1] else x[..., :0])
+
+
+def _window_slices(x: np.ndarray, window: int):
+    """Yield the `window` aligned slices whose element t covers x[t - k] for k = window-1..0."""
+    length = x.shape[-1] - window + 1
+    for k in range(window):
+        yield x[..., k:k + length]
+
+
+def _pad(values: np.ndarray, total: int) -> np.ndarray:
+    out = np.full(values.shape[:-1] + (total,), np.nan)
+    if values.shape[-1] > 0:
+        out[..., total - values.shape[-1]:] = values
+    return out
+
+
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    x = np.asarray(x, dtype="float64")
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    total = np.zeros(x.shape[:-1] + (x.shape[-1] - window + 1,))
+    for part in _window_slices(x, window):
+        total += part
+    return _pad(total, x.shape[-1])
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return rolling_sum(x, window) / window
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Sample standard deviation (ddof=1); two-pass per window, so no cancellation on long series."""
+    x = np.asarray(x, dtype="float64")
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    mean = rolling_mean(x, window)[..., window - 1:]
+    sq = np.zeros_like(mean)
+    for part in _window_slices(x, window):
+        sq += (part - mean) ** 2
+    return _pad(np.sqrt(sq / (window - 1)), x.shape[-1])
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    x = np.asarray(x, dtype="float64")
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    out = None
+    for part in _window_slices(x, window):
+        out = part.copy() if out is None else np.maximum(out, part)
+    return _pad(out, x.shape[-1])
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    x = np.asarray(x, dtype="float64")
+    if x.shape[-1] < window:
+        return np.full(x.shape, np.nan)
+    out = None
+    for part in _window_slices(x, window):
+        out = part.copy() if out is None else np.minimum(out, part)
+    return _pad(out, x.shape[-1])
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    """First difference with 0 in the first slot (pandas diff() then where(..., 0))."""
+    x = np.asarray(x, dtype="float64")
+    out = np.zeros_like(x)
+    out[..., 1:] = x[..., 1:] - x[..., :-1]
+    return out
+
+
+def shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Shift along the last axis, filling the vacated slots with NaN."""
+    x = np.asarray(x, dtype="float64")
+    out = np.full(x.shape, np.nan)
+    if periods > 0:
+        out[..., periods:] = x[..., :-periods]
+    elif periods < 0:
+        out[..., :periods] = x[..., -periods:]
+    else:
+        out[...] = x
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range; the first bar (no previous close) is high - low, as in the pandas path."""
+    high = np.asarray(high, dtype="float64")
+    low = np.asarray(low, dtype="float64")
+    prev_close = shift(close, 1)
+    # fmax skips the NaN previous close of the first bar, like DataFrame.max(axis=1)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def rsi_from_means(gain: np.ndarray, loss: np.ndarray) -> np.ndarray:
+    """RSI from average gain/loss: 100 when there are no losses, NaN when flat."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + gain / loss)
+
+
+def wilder(x: np.ndarray, period: int, start: int = 0) -> np.ndarray:
+    """
+    Wilder smoothing (alpha = 1/period). The first value is the plain mean
+    of x[start:start+period] at index start+period-1; earlier slots are NaN.
+    """
+    x = np.asarray(x, dtype="float64")
+    out = np.full(x.shape, np.nan)
+    first = start + period - 1
+    if x.shape[-1] <= first:
+        return out
+    seed = x[..., start:start + period].mean(axis=-1)
+    out[..., first:] = _recurrence(x[..., first:], 1.0 / period, seed)
+    return out
+
+
+def rsi_wilder(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI with Wilder-smoothed gains/losses, seeded from the first `period` changes."""
+    delta = diff(close)
+    gain = wilder(np.maximum(delta, 0), period, start=1)
+    loss = wilder(np.maximum(-delta, 0), period, start=1)
+    return rsi_from_means(gain, loss)
+
+
+def stochastic(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               k_period: int = 14, d_period: int = 3):
+    """Stochastic oscillator: (%K, %D), %D being the simple mean of %K."""
+    lowest = rolling_min(low, k_period)
+    highest = rolling_max(high, k_period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100 * (np.asarray(close, dtype="float64") - lowest) / (highest - lowest)
+    return k, rolling_mean(k, d_period)
+
+
+def directional_movement(high: np.ndarray, low: np.ndarray):
+    """(+DM, -DM): the larger positive move of high-up / low-down, 0 in the first slot."""
+    up = diff(high)
+    down = -diff(low)
+    plus = np.where((up > down) & (up > 0), up, 0.0)
+    minus = np.where((down > up) & (down > 0), down, 0.0)
+    return plus, minus
+
+
+def dmi(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14):
+    """(+DI, -DI, ADX) with Wilder smoothing; ADX is first defined at bar 2*period - 1."""
+    plus_dm, minus_dm = directional_movement(high, low)
+    tr = wilder(true_range(high, low, close), period, start=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100 * wilder(plus_dm, period, start=1) / tr
+        minus_di = 100 * wilder(minus_dm, period, start=1) / tr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return plus_di, minus_di, wilder(dx, period, start=period)
+
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """Volume-weighted typical price, anchored at the first bar of the series."""
+    volume = np.asarray(volume, dtype="float64")
+    typical = (np.asarray(high, dtype="float64") + np.asarray(low, dtype="float64")
+               + np.asarray(close, dtype="float64")) / 3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(typical * volume, axis=-1) / np.cumsum(volume, axis=-1)
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """On-balance volume, starting from 0 at the first bar."""
+    return np.cumsum(np.sign(diff(close)) * np.asarray(volume, dtype="float64"), axis=-1)
+
+
+def midpoint(high: np.ndarray, low: np.ndarray, window: int) -> np.ndarray:
+    """(highest high + lowest low) / 2 over `window` bars (Ichimoku lines)."""
+    return (rolling_max(high, window) + rolling_min(low, window)) / 2
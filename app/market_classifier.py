@@ -1,7 +1,8 @@
+import numpy as np
 import pandas as pd
-import joblib
 from typing import Dict, Any
-from config import MARKET_MODEL_PATH
+from config import MARKET_MODEL_PATH, MARKET_COMPILED_MODEL_PATH
+from app.model_registry import model_registry
 
 class MarketClassifier:
     """
@@ -9,7 +10,6 @@ class MarketClassifier:
     """
     
     def __init__(self):
-        self.model = None
         self.load_model()
         
         # Predefined market conditions
@@ -24,14 +24,36 @@ class MarketClassifier:
             7: "Reversal Potential"
         }
     
+    @property
+    def model(self):
+        """The shared market model (hot-reloaded by the registry); None = rule-based fallback."""
+        return model_registry.get(MARKET_MODEL_PATH)
+
+    @property
+    def compiled(self):
+        """
+        Flattened export of the market model (see app.compiled_forest), if
+        one was written from the market model file currently served. An
+        export of any other version is ignored, so a model replaced without
+        recompiling still takes effect.
+        """
+        compiled = model_registry.get(MARKET_COMPILED_MODEL_PATH)
+        if compiled is None:
+            return None
+        model_registry.get(MARKET_MODEL_PATH)
+        source = model_registry.signature(MARKET_MODEL_PATH)
+        if source is None or getattr(compiled, 'source_signature', None) != source:
+            return None
+        return compiled
+
     def load_model(self):
         """Load the pre-trained market classification model."""
-        try:
-            self.model = joblib.load(MARKET_MODEL_PATH)
+        if self.compiled is not None:
+            print(f"Loaded compiled market model from {MARKET_COMPILED_MODEL_PATH}")
+        elif self.model is not None:
             print(f"Loaded market model from {MARKET_MODEL_PATH}")
-        except FileNotFoundError:
+        else:
             print(f"Model file {MARKET_MODEL_PATH} not found. Using rule-based fallback.")
-            self.model = None
     
     def extract_features(self, df: pd.DataFrame, indicators: Dict[str, Any]) -> pd.DataFrame:
         """
@@ -61,12 +83,18 @@ class MarketClassifier:
         """
         Classify the current market condition.
         """
-        # Use ML model if available
-        if self.model is not None:
+        # Use ML model if available; the compiled export gives class and probability in one pass
+        compiled = self.compiled
+        model = compiled if compiled is not None else self.model
+        if model is not None:
             try:
                 features = self.extract_features(df, indicators)
-                prediction = self.model.predict(features)[0]
-                confidence = np.max(self.model.predict_proba(features)[0])
+                if compiled is not None:
+                    labels, proba = compiled.predict_with_proba(features)
+                    prediction, confidence = labels[0], np.max(proba[0])
+                else:
+                    prediction = model.predict(features)[0]
+                    confidence = np.max(model.predict_proba(features)[0])
                 condition = self.market_conditions.get(prediction, "Unknown")
                 
                 return {
@@ -80,6 +108,220 @@ class MarketClassifier:
         # Fallback to rule-based classification
         return self.rule_based_classification(df, indicators)
     
+    @staticmethod
+    def _change(values: np.ndarray, lag: int) -> np.ndarray:
+        """Per-bar (x[t] - x[t-lag]) / x[t-lag]; 0 until the lookback exists, like the iloc lookups."""
+        out = np.zeros(len(values))
+        if len(values) > lag:
+            out[lag:] = (values[lag:] - values[:-lag]) / values[:-lag]
+        return out
+
+    @staticmethod
+    def _indicator(indicators: Dict[str, Any], name: str, default: float, length: int) -> np.ndarray:
+        """Per-bar values of an indicator Series/array (as from calculate_indicators), or `default`."""
+        if not indicators or name not in indicators:
+            return np.full(length, default, dtype='float64')
+        return np.asarray(indicators[name], dtype='float64')
+
+    def extract_features_series(self, df: pd.DataFrame, indicators: Dict[str, Any] = None) -> pd.DataFrame:
+        """
+        `extract_features` for every bar at once: row t holds the features
+        that call would return for df.iloc[:t+1]. `indicators` holds full
+        indicator Series (e.g. IndicatorEngine.calculate_indicators(df)).
+        """
+        close = df['close'].to_numpy(dtype='float64')
+        volume = df['volume'].to_numpy(dtype='float64')
+        n = len(close)
+
+        features = {
+            'price_change_1h': self._change(close, 11),
+            'price_change_4h': self._change(close, 47),
+            'price_change_24h': self._change(close, 95),
+        }
+        if indicators:
+            upper = self._indicator(indicators, 'upper_band', 0, n)
+            lower = self._indicator(indicators, 'lower_band', 0, n)
+            features['rsi'] = self._indicator(indicators, 'rsi', 50, n)
+            features['macd_histogram'] = self._indicator(indicators, 'histogram', 0, n)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features['bollinger_position'] = np.where(upper != lower, (close - lower) / (upper - lower), 0.5)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features['volume_change'] = np.zeros(n)
+            features['volume_change'][1:] = volume[1:] / volume[:-1] - 1  # pct_change
+            features['volume_ratio'] = np.ones(n)
+            if n >= 20:
+                features['volume_ratio'][19:] = volume[19:] / (np.convolve(volume, np.ones(20), 'valid') / 20)
+
+        return pd.DataFrame(features, index=df.index)
+
+    def classify_series(self, df: pd.DataFrame, indicators: Dict[str, Any] = None) -> pd.DataFrame:
+        """
+        Regime label, confidence and code for every bar (one row per bar),
+        from one model call over all bars, or the vectorized rules.
+        """
+        predicted = self._predict_rows(lambda: self.extract_features_series(df, indicators)) if len(df) else None
+        if predicted is None:
+            return self.rule_based_series(df, indicators)
+
+        codes, confidence, scored = predicted
+        result = pd.DataFrame({
+            'condition': [self.market_conditions.get(code, "Unknown") for code in codes],
+            'confidence': confidence,
+            'code': codes,
+        }, index=df.index)
+        if not scored.all():
+            # Bars the model could not score get the rules, as classify_market does
+            result.loc[~scored] = self.rule_based_series(df, indicators)[~scored]
+        return result
+
+    def _predict_rows(self, build_features):
+        """
+        (codes, confidences, scored) from one model call over a feature
+        matrix, or None without a usable model. Rows with an infinite
+        feature (e.g. volume_change after a zero-volume bar) are left out
+        (scored False), as classify_market falls back to the rules for
+        such a bar, so one bad row does not take the others off the model.
+        If the model also rejects NaN (sklearn < 1.4), rows with NaN are
+        left out as well.
+        """
+        compiled = self.compiled
+        model = compiled if compiled is not None else self.model
+        if model is None:
+            return None
+        try:
+            features = build_features()
+            values = features.to_numpy(dtype='float64')
+        except Exception as e:
+            print(f"Error in market classification: {e}")
+            return None
+
+        codes = np.full(len(values), -1, dtype=np.asarray(model.classes_).dtype)
+        confidence = np.zeros(len(values))
+        finite = ~np.isinf(values).any(axis=1)
+        for scored in (finite, finite & ~np.isnan(values).any(axis=1)):
+            if not scored.any():
+                return codes, confidence, scored
+            try:
+                if compiled is not None:
+                    codes[scored], proba = compiled.predict_with_proba(features[scored])
+                else:
+                    proba = model.predict_proba(features[scored])
+                    codes[scored] = model.classes_.take(np.argmax(proba, axis=1))
+                confidence[scored] = proba.max(axis=1)
+                return codes, confidence, scored
+            except Exception as e:
+                error = e
+        print(f"Error in market classification: {error}")
+        return None
+
+    def classify_batch(self, frames: Dict[str, pd.DataFrame], indicators: Dict[str, Dict[str, Any]] = None,
+                       shared_state: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Classify the latest bar of many symbols at once.
+
+        `frames` maps symbol -> candles and `indicators` symbol -> the dict
+        classify_market takes. One feature matrix is built for the whole
+        universe and scored with a single model call (or the vectorized
+        rules). Results are also stored per symbol in
+        shared_state['market_conditions'] when `shared_state` is given.
+        """
+        indicators = indicators or {}
+        symbols = [symbol for symbol, df in frames.items() if len(df)]
+        currents = [indicators.get(symbol, {}).get('current', {}) for symbol in symbols]
+        closes = [frames[symbol]['close'].to_numpy(dtype='float64') for symbol in symbols]
+        volumes = [frames[symbol]['volume'].to_numpy(dtype='float64') for symbol in symbols]
+
+        def change(values, lag):
+            return (values[-1] - values[-lag - 1]) / values[-lag - 1] if len(values) > lag else 0
+
+        def build_features():
+            features = {
+                'price_change_1h': [change(close, 11) for close in closes],
+                'price_change_4h': [change(close, 47) for close in closes],
+                'price_change_24h': [change(close, 95) for close in closes],
+            }
+            if any('current' in indicators.get(symbol, {}) for symbol in symbols):
+                features['rsi'] = [current.get('rsi', 50) for current in currents]
+                features['macd_histogram'] = [current.get('histogram', 0) for current in currents]
+                features['bollinger_position'] = [
+                    (close[-1] - current.get('lower_band', 0)) / (current.get('upper_band', 1) - current.get('lower_band', 1))
+                    if current.get('upper_band', 0) != current.get('lower_band', 0) else 0.5
+                    for close, current in zip(closes, currents)
+                ]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features['volume_change'] = [volume[-1] / volume[-2] - 1 if len(volume) > 1 else 0
+                                             for volume in volumes]
+                features['volume_ratio'] = [volume[-1] / volume[-20:].mean() if len(volume) >= 20 else 1
+                                            for volume in volumes]
+            return pd.DataFrame(features, index=symbols, dtype='float64')
+
+        predicted = self._predict_rows(build_features) if symbols else None
+        if predicted is not None:
+            codes, confidence, scored = predicted
+            conditions = np.array([self.market_conditions.get(code, "Unknown") for code in codes], dtype=object)
+        else:
+            codes, confidence, scored = None, None, np.zeros(len(symbols), dtype=bool)
+
+        if not scored.all():
+            # Symbols the model could not score get the rules, as classify_market does
+            rest = np.flatnonzero(~scored)
+            rule_conditions, rule_confidence, rule_codes = self._apply_rules(
+                np.array([change(closes[i], 95) for i in rest], dtype='float64'),
+                np.array([currents[i].get('rsi', 50) for i in rest], dtype='float64'),
+                np.array([len(closes[i]) >= 20 for i in rest], dtype=bool))
+            if predicted is None:
+                conditions, confidence, codes = rule_conditions, rule_confidence, rule_codes
+            else:
+                conditions[rest], confidence[rest], codes[rest] = rule_conditions, rule_confidence, rule_codes
+
+        results = {symbol: {"condition": "Insufficient Data", "confidence": 0, "code": -1} for symbol in frames}
+        for symbol, condition, score, code in zip(symbols, conditions, confidence, codes):
+            results[symbol] = {"condition": condition, "confidence": float(score), "code": int(code)}
+
+        if shared_state is not None:
+            shared_state.setdefault('market_conditions', {}).update(results)
+        return results
+
+    def rule_based_series(self, df: pd.DataFrame, indicators: Dict[str, Any] = None) -> pd.DataFrame:
+        """
+        `rule_based_classification` for every bar at once, using shifted
+        arrays instead of one call per bar.
+        """
+        close = df['close'].to_numpy(dtype='float64')
+        n = len(close)
+        condition, confidence, code = self._apply_rules(self._change(close, 95),
+                                                        self._indicator(indicators, 'rsi', 50, n),
+                                                        np.arange(n) >= 19)
+        return pd.DataFrame({'condition': condition, 'confidence': confidence, 'code': code}, index=df.index)
+
+    @staticmethod
+    def _apply_rules(change: np.ndarray, rsi: np.ndarray, enough: np.ndarray):
+        """The rule_based_classification cascade over arrays; `enough` marks rows with >= 20 bars."""
+        rules = [
+            (change > 0.05, "Strong Uptrend", 0, 0.8),
+            (change > 0.02, "Weak Uptrend", 1, 0.7),
+            (change < -0.05, "Strong Downtrend", 4, 0.8),
+            (change < -0.02, "Weak Downtrend", 3, 0.7),
+            (np.abs(change) < 0.01, "Sideways/Breakout", 2, 0.6),
+        ]
+        masks = [rule[0] for rule in rules]
+        condition = np.select(masks, [rule[1] for rule in rules], "Uncertain").astype(object)
+        code = np.select(masks, [rule[2] for rule in rules], -1)
+        confidence = np.select(masks, [rule[3] for rule in rules], 0.5)
+
+        # Adjust based on RSI
+        overbought = (rsi > 70) & np.isin(code, (0, 1))
+        oversold = (rsi < 30) & np.isin(code, (3, 4))
+        condition[overbought] = condition[overbought] + " (Overbought)"
+        condition[oversold] = condition[oversold] + " (Oversold)"
+        confidence = np.where(overbought | oversold, confidence * 0.9, confidence)
+
+        condition[~enough] = "Insufficient Data"
+        confidence[~enough] = 0
+        code[~enough] = -1
+        return condition, confidence, code
+
     def rule_based_classification(self, df: pd.DataFrame, indicators: Dict[str, Any]) -> Dict[str, Any]:
         """
         Rule-based fallback for market classification.
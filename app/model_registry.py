@@ -0,0 +1,126 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+
+from config import MODEL_RELOAD_INTERVAL
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a model file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _Entry:
+    __slots__ = ("model", "signature", "version")
+
+    def __init__(self, model, signature, version):
+        self.model = model
+        self.signature = signature
+        self.version = version
+
+
+class ModelRegistry:
+    """
+    Process-wide home of the trained models.
+
+    Each model file is loaded once, with `mmap_mode='r'` so joblib maps
+    its NumPy arrays from the page cache instead of copying them, and the
+    same object is handed to every PatternDetector/MarketClassifier.
+    A daemon thread polls the watched files (mtime/size) and loads a new
+    version in the background; the swap is a single reference assignment,
+    so inference never waits on a load and never sees a half-loaded
+    model. A file that fails to load (e.g. still being written) keeps the
+    previous version and is retried when it changes again.
+    """
+
+    def __init__(self, poll_interval: float = MODEL_RELOAD_INTERVAL):
+        self.poll_interval = poll_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()  # serialises loads; reads never take it
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _load(self, path: str, previous: Optional[_Entry]) -> _Entry:
+        signature = file_signature(path)
+        if signature is None:
+            return previous or _Entry(None, None, 0)
+        model = joblib.load(path, mmap_mode="r")
+        version = (previous.version if previous else 0) + 1
+        print(f"[ModelRegistry] Loaded {os.path.basename(path)} (version {version})")
+        return _Entry(model, signature, version)
+
+    def get(self, path: str) -> Any:
+        """The current model at `path`, or None if the file does not exist (yet)."""
+        entry = self._entries.get(path)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is None:
+                    try:
+                        entry = self._load(path, None)
+                    except Exception as e:
+                        print(f"[ModelRegistry] Failed to load {path}: {e}")
+                        entry = _Entry(None, None, 0)
+                    self._entries[path] = entry
+            self.start()
+        return entry.model
+
+    def signature(self, path: str) -> Optional[Tuple[int, int]]:
+        """file_signature of the version currently served for `path` (None if none was loaded)."""
+        entry = self._entries.get(path)
+        return entry.signature if entry else None
+
+    def version(self, path: str) -> int:
+        entry = self._entries.get(path)
+        return entry.version if entry else 0
+
+    def put(self, path: str, model: Any) -> None:
+        """Serve `model` for `path` (e.g. one trained in-process) until the file changes."""
+        with self._lock:
+            previous = self._entries.get(path)
+            self._entries[path] = _Entry(model, file_signature(path),
+                                         (previous.version if previous else 0) + 1)
+
+    def refresh(self) -> None:
+        """Reload every watched model whose file changed since it was loaded."""
+        for path, entry in list(self._entries.items()):
+            signature = file_signature(path)
+            if signature is None or signature == entry.signature:
+                continue
+            with self._lock:
+                previous = self._entries[path]
+                try:
+                    self._entries[path] = self._load(path, previous)
+                except Exception as e:
+                    print(f"[ModelRegistry] Keeping previous {os.path.basename(path)}: {e}")
+                    # Remember the bad file so it is only retried once it changes again
+                    self._entries[path] = _Entry(previous.model, signature, previous.version)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[ModelRegistry] Watcher error: {e}")
+
+    def start(self) -> None:
+        """Start the file watcher (idempotent; also started by the first `get`)."""
+        with self._lock:
+            if self._watcher is None and self.poll_interval:
+                self._stop.clear()
+                self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+                self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._watcher = None
+
+
+# Shared by every model consumer in the process
+model_registry = ModelRegistry()
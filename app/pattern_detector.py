@@ -1,9 +1,16 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
 from typing import Dict, Any, List
 from config import PATTERN_MODEL_PATH
+from app.candle_store import CandleStore, normalize_interval
+from app.candle_cache import candle_cache
+from app.pattern_rules import PatternRuleSet, default_rules
+from app.model_registry import model_registry
+
+# Model input columns, in training order (numeric columns of the original extract_features output)
+PATTERN_FEATURES = ('open', 'high', 'low', 'close', 'volume', 'body_size', 'upper_wick',
+                    'lower_wick', 'price_change', 'volume_change')
 
 class PatternDetector:
     """
@@ -11,89 +18,184 @@ class PatternDetector:
     Uses pre-trained models from models/ directory.
     """
 
-    def __init__(self):
-        self.model = None
+    def __init__(self, store=None, cache=None, rules: PatternRuleSet = None):
+        self.store = store or CandleStore()
+        self.rules = rules or default_rules
+        self.cache = cache if cache is not None else candle_cache
+        self.min_confidence = 0.6  # Minimum model probability to report a pattern
         self.load_model()
 
+        # Pattern model class labels (0 = no pattern)
+        self.pattern_classes = {
+            0: None,
+            1: "Bullish Engulfing",
+            2: "Bearish Engulfing",
+            3: "Doji",
+            4: "Hammer"
+        }
+
+    @property
+    def model(self):
+        """The shared pattern model (hot-reloaded by the registry); None = rule-based only."""
+        return model_registry.get(PATTERN_MODEL_PATH)
+
     def load_model(self):
         """Load the pre-trained pattern recognition model."""
-        try:
-            self.model = joblib.load(PATTERN_MODEL_PATH)
+        if self.model is not None:
             print(f"Loaded pattern model from {PATTERN_MODEL_PATH}")
-        except FileNotFoundError:
+        else:
             print(f"Model file {PATTERN_MODEL_PATH} not found. Using rule-based fallback.")
-            self.model = None
+
+    @staticmethod
+    def feature_matrix(df: pd.DataFrame, rows: int = None) -> np.ndarray:
+        """
+        (rows x PATTERN_FEATURES) matrix for the last `rows` bars (all if
+        None), computed straight from the column arrays without copying the
+        frame. Change features of the series' first bar are NaN.
+        """
+        total = len(df)
+        start = total - (total if rows is None else min(rows, total))
+        out = np.empty((total - start, len(PATTERN_FEATURES)))
+        o, h, l, c, v = (df[column].to_numpy(dtype="float64")
+                         for column in ('open', 'high', 'low', 'close', 'volume'))
+
+        for i, column in enumerate((o, h, l, c, v)):
+            out[:, i] = column[start:]
+        o, h, l = o[start:], h[start:], l[start:]
+        out[:, 5] = np.abs(out[:, 3] - o)
+        out[:, 6] = h - np.maximum(o, out[:, 3])
+        out[:, 7] = np.minimum(o, out[:, 3]) - l
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i, column in ((8, c), (9, v)):
+                prev = column[start - 1:total - 1] if start else np.concatenate([[np.nan], column[:total - 1]])
+                out[:, i] = column[start:] / prev - 1  # pct_change
+        return out
 
     def extract_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Extract features from OHLCV data for pattern recognition.
         """
-        features = df.copy()
-        features['body_size'] = abs(features['close'] - features['open'])
-        features['upper_wick'] = features['high'] - features[['open', 'close']].max(axis=1)
-        features['lower_wick'] = features[['open', 'close']].min(axis=1) - features['low']
-        features['price_change'] = features['close'].pct_change()
-        features['volume_change'] = features['volume'].pct_change()
-        return features.dropna()
+        matrix = self.feature_matrix(df)
+        features = pd.DataFrame(matrix, columns=PATTERN_FEATURES, index=df.index)
+        return features[~np.isnan(matrix).any(axis=1)]
+
+    def pattern_masks(self, open_, high, low, close) -> Dict[str, np.ndarray]:
+        """
+        Boolean mask per rule-based pattern (see app.pattern_rules), True on
+        the bar that completes it. Inputs may be one series or a
+        (symbols x bars) array; bars without enough history are False.
+        """
+        return self.rules.evaluate(open_, high, low, close)
+
+    def scan(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Every rule-based pattern occurrence over the whole series in one
+        vectorized pass. Returns one row per occurrence (position of the
+        completing bar, its timestamp if present, pattern, confidence),
+        ordered by position.
+        """
+        masks = self.pattern_masks(df['open'], df['high'], df['low'], df['close'])
+        positions, names = [], []
+        for name, mask in masks.items():
+            hits = np.flatnonzero(mask)
+            positions.append(hits)
+            names.append(np.full(len(hits), name, dtype=object))
+        positions = np.concatenate(positions)
+        names = np.concatenate(names)
+        order = np.argsort(positions, kind="stable")  # stable: keeps rule order per bar
+
+        hits = pd.DataFrame({
+            "index": positions[order],
+            "pattern": names[order],
+            "confidence": pd.Series(names[order], dtype=object).map(self.rules.confidence).to_numpy(dtype="float64"),
+        })
+        if 'timestamp' in df.columns:
+            hits.insert(1, "timestamp", df['timestamp'].to_numpy()[hits["index"].to_numpy()])
+        return hits
 
     def predict_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
         Predict candlestick patterns from the latest data.
         Returns pattern name and confidence.
         """
-        patterns = []
+        return self.predict_batch({None: df})[None]
 
-        # Use ML model if available (TODO: implement when ready)
-        if self.model is not None:
+    def predict_batch(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Patterns on the latest bar of every symbol in `frames`.
+
+        The rule masks run once over a (symbols x window) array of the
+        last bars and the model scores the whole universe in a single
+        predict_proba call; a pattern found by both keeps the higher
+        confidence.
+        """
+        results = {symbol: [] for symbol in frames}
+
+        window = max(3, self.rules.lookback + 1)
+        ready = [symbol for symbol, df in frames.items() if len(df) >= window]
+        if ready:
+            tails = [np.stack([frames[symbol][column].to_numpy(dtype="float64")[-window:] for symbol in ready])
+                     for column in ('open', 'high', 'low', 'close')]
+            for name, mask in self.pattern_masks(*tails).items():
+                for i in np.flatnonzero(mask[:, -1]):
+                    results[ready[i]].append({"pattern": name, "confidence": self.rules.confidence(name)})
+
+        # Use ML model if available (one reference, so a hot reload cannot swap it mid-batch)
+        model = self.model
+        if model is not None:
             try:
-                features = self.extract_features(df.tail(5))
-                # Replace this with real model inference
-                pass
+                for symbol, found in self._model_patterns(model, frames).items():
+                    patterns = results[symbol]
+                    match = next((p for p in patterns if p["pattern"] == found["pattern"]), None)
+                    if match is None:
+                        patterns.append(found)
+                    else:
+                        match["confidence"] = max(match["confidence"], found["confidence"])
             except Exception as e:
                 print(f"Error in model prediction: {e}")
 
-        # Rule-based fallback
-        if len(df) >= 3:
-            latest = df.iloc[-1]
-            prev = df.iloc[-2]
-            prev2 = df.iloc[-3]
-
-            # Bullish Engulfing
-            if (latest['close'] > latest['open'] and 
-                prev['close'] < prev['open'] and 
-                latest['open'] < prev['close'] and 
-                latest['close'] > prev['open']):
-                patterns.append({"pattern": "Bullish Engulfing", "confidence": 0.85})
-
-            # Bearish Engulfing
-            elif (latest['close'] < latest['open'] and 
-                  prev['close'] > prev['open'] and 
-                  latest['open'] > prev['close'] and 
-                  latest['close'] < prev['open']):
-                patterns.append({"pattern": "Bearish Engulfing", "confidence": 0.85})
-
-            # Doji
-            if abs(latest['close'] - latest['open']) / max((latest['high'] - latest['low']), 0.0001) < 0.1:
-                patterns.append({"pattern": "Doji", "confidence": 0.75})
-
-            # Hammer
-            if (latest['close'] > latest['open'] and 
-                (latest['close'] - latest['low']) > 2 * (latest['high'] - latest['close']) and
-                (latest['open'] - latest['low']) > 2 * (latest['high'] - latest['open'])):
-                patterns.append({"pattern": "Hammer", "confidence": 0.8})
-
-        return patterns
+        return results
+
+    def _model_patterns(self, model, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+        """Most likely model pattern per symbol, from one predict_proba call over the latest bars."""
+        symbols = [symbol for symbol, df in frames.items() if len(df) >= 2]
+        features = np.empty((len(symbols), len(PATTERN_FEATURES)))
+        for i, symbol in enumerate(symbols):
+            features[i] = self.feature_matrix(frames[symbol], rows=1)[0]
+        valid = np.flatnonzero(np.isfinite(features).all(axis=1))
+        if len(valid) == 0:
+            return {}
+
+        proba = model.predict_proba(features[valid])
+        best = proba.argmax(axis=1)
+        confidence = proba[np.arange(len(best)), best]
+        labels = model.classes_[best]
+
+        found = {}
+        for i, label, score in zip(valid, labels, confidence):
+            name = self.pattern_classes.get(int(label))
+            if name is not None and score >= self.min_confidence:
+                found[symbols[i]] = {"pattern": name, "confidence": float(score)}
+        return found
 
     def detect(self, symbol: str, timeframe: str = "15") -> str:
         """
-        Detect patterns from the latest CSV file for chatbot integration.
+        Detect patterns from the in-memory candle cache, then the candle
+        store (legacy CSV as last fallback) for chatbot integration.
         """
+        interval = normalize_interval(timeframe)
         path = f"data/live_candles/{symbol}_{timeframe}_latest.csv"
-        if not os.path.exists(path):
+        cached = (symbol, interval) in self.cache
+        if not cached and not self.store.exists(symbol, interval) and not os.path.exists(path):
             return f"No data found for {symbol} ({timeframe}m)."
 
         try:
-            df = pd.read_csv(path)
+            if cached:
+                df = self.cache.frame(symbol, interval, 200)
+            elif self.store.exists(symbol, interval):
+                df = self.store.read_frame(symbol, interval, 200)
+            else:
+                df = pd.read_csv(path)
             if df.empty or len(df) < 5:
                 return f"Not enough candle data to detect patterns."
 
@@ -0,0 +1,234 @@
+import ast
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.indicator_math import shift
+
+# Per-bar quantities a rule can reference, as functions of (open, high, low, close)
+FIELDS = {
+    'open': lambda o, h, l, c: o,
+    'high': lambda o, h, l, c: h,
+    'low': lambda o, h, l, c: l,
+    'close': lambda o, h, l, c: c,
+    'body': lambda o, h, l, c: np.abs(c - o),
+    'upper_wick': lambda o, h, l, c: h - np.maximum(o, c),
+    'lower_wick': lambda o, h, l, c: np.minimum(o, c) - l,
+    'range': lambda o, h, l, c: h - l,
+    'mid': lambda o, h, l, c: (o + c) / 2,  # body midpoint
+}
+
+# name -> (rule, confidence), in reporting order
+DEFAULT_RULES = {
+    "Bullish Engulfing": ("close > open and close[-1] < open[-1] and open < close[-1] and close > open[-1]", 0.85),
+    "Bearish Engulfing": ("close < open and close[-1] > open[-1] and open > close[-1] and close < open[-1]", 0.85),
+    "Doji": ("body / max(range, 0.0001) < 0.1", 0.75),
+    "Hammer": ("close > open and close - low > 2 * (high - close) and open - low > 2 * (high - open)", 0.8),
+    "Shooting Star": ("close < open and high - close > 2 * (close - low) and high - open > 2 * (open - low)", 0.8),
+    # Long candle, small-bodied pause, then a candle closing past the first body's midpoint
+    "Morning Star": ("close[-2] < open[-2] and body[-1] < 0.5 * body[-2] and close > open and close > mid[-2]", 0.8),
+    "Evening Star": ("close[-2] > open[-2] and body[-1] < 0.5 * body[-2] and close < open and close < mid[-2]", 0.8),
+    # Three same-direction candles, each opening inside the previous body and closing beyond it
+    "Three White Soldiers": ("close > open and close[-1] > open[-1] and close[-2] > open[-2]"
+                             " and close > close[-1] > close[-2]"
+                             " and open[-1] < open < close[-1] and open[-2] < open[-1] < close[-2]", 0.8),
+    "Three Black Crows": ("close < open and close[-1] < open[-1] and close[-2] < open[-2]"
+                          " and close < close[-1] < close[-2]"
+                          " and open[-1] > open > close[-1] and open[-2] > open[-1] > close[-2]", 0.8),
+}
+
+_COMPARE = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!='}
+_ARITHMETIC = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+_NAMESPACE = {'__builtins__': {}, 'abs': np.abs, 'where': np.where}  # all a compiled rule can call
+
+
+class _Translator:
+    """
+    Turns a rule's Python-syntax AST into an array expression string over
+    variables named `<field>_<bars back>`, recording the variables used.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns = set()
+
+    def fail(self, node, reason: str):
+        raise ValueError(f"Pattern rule {self.name!r}: {reason} ({ast.dump(node)[:60]})")
+
+    def translate(self, node) -> str:
+        method = getattr(self, f"visit_{type(node).__name__}", None)
+        if method is None:
+            self.fail(node, "unsupported syntax")
+        return method(node)
+
+    def visit_Expression(self, node):
+        return self.translate(node.body)
+
+    @staticmethod
+    def is_condition(node) -> bool:
+        """True for nodes that yield a boolean mask: comparisons and and/or/not over them."""
+        return (isinstance(node, (ast.Compare, ast.BoolOp))
+                or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)))
+
+    def condition(self, node) -> str:
+        if not self.is_condition(node):
+            self.fail(node, "and/or/not need comparisons on both sides (e.g. close > open)")
+        return self.translate(node)
+
+    def value(self, node) -> str:
+        if self.is_condition(node):
+            self.fail(node, "arithmetic needs numbers, not conditions")
+        return self.translate(node)
+
+    def visit_BoolOp(self, node):
+        op = ' & ' if isinstance(node.op, ast.And) else ' | '
+        return '(' + op.join(f"({self.condition(v)})" for v in node.values) + ')'
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            return f"(~{self.condition(node.operand)})"
+        if isinstance(node.op, ast.USub):
+            return f"(-{self.value(node.operand)})"
+        if isinstance(node.op, ast.UAdd):
+            return self.value(node.operand)
+        self.fail(node, "unsupported unary operator")
+
+    def visit_BinOp(self, node):
+        op = _ARITHMETIC.get(type(node.op))
+        if op is None:
+            self.fail(node, "unsupported arithmetic operator")
+        return f"({self.value(node.left)} {op} {self.value(node.right)})"
+
+    def visit_Compare(self, node):
+        # a < b < c  ->  (a < b) & (b < c)
+        terms = [self.value(node.left)] + [self.value(c) for c in node.comparators]
+        parts = []
+        for i, op in enumerate(node.ops):
+            symbol = _COMPARE.get(type(op))
+            if symbol is None:
+                self.fail(node, "unsupported comparison")
+            parts.append(f"({terms[i]} {symbol} {terms[i + 1]})")
+        return '(' + ' & '.join(parts) + ')'
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            self.fail(node, "only numeric constants are allowed")
+        return repr(float(node.value))
+
+    def _column(self, node, field: str, back: int) -> str:
+        if field not in FIELDS:
+            self.fail(node, f"unknown field {field!r} (use one of {', '.join(FIELDS)})")
+        self.columns.add((field, back))
+        return f"{field}_{back}"
+
+    def visit_Name(self, node):
+        return self._column(node, node.id, 0)
+
+    def visit_Subscript(self, node):
+        if not isinstance(node.value, ast.Name):
+            self.fail(node, "only fields can be indexed")
+        index = node.slice.value if type(node.slice).__name__ == 'Index' else node.slice  # Python 3.8 wraps it
+        try:
+            offset = ast.literal_eval(index)
+        except ValueError:
+            offset = None
+        if not isinstance(offset, int) or offset > 0:
+            self.fail(node, "bar offsets must be integers <= 0 (field[-1] is the previous bar)")
+        return self._column(node, node.value.id, -offset)
+
+    def visit_Call(self, node):
+        func = node.func.id if isinstance(node.func, ast.Name) else None
+        args = [self.value(a) for a in node.args]
+        if node.keywords or func not in ('abs', 'max', 'min') or not args:
+            self.fail(node, "only abs(x), max(a, b, ...) and min(a, b, ...) can be called")
+        if func == 'abs':
+            if len(args) != 1:
+                self.fail(node, "abs takes one argument")
+            return f"abs({args[0]})"
+        op = '>' if func == 'max' else '<'
+        result = args[0]
+        for arg in args[1:]:
+            result = f"where({result} {op} {arg}, {result}, {arg})"
+        return result
+
+
+class PatternRule:
+    """One compiled rule: its array expression, the columns it reads and how many bars back it looks."""
+
+    def __init__(self, name: str, expression: str, confidence: float):
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Pattern rule {name!r}: {e.msg}") from None
+        translator = _Translator(name)
+        self.name = name
+        self.expression = expression
+        self.confidence = confidence
+        if not translator.is_condition(tree.body):
+            translator.fail(tree.body, "a rule must be a comparison, or comparisons joined by and/or/not")
+        self.source = translator.translate(tree)
+        self.columns = translator.columns
+        self.lookback = max((back for _, back in self.columns), default=0)
+        self.code = compile(self.source, f"<pattern rule {name}>", 'eval')
+
+
+class PatternRuleSet:
+    """
+    Candlestick patterns declared as boolean expressions over bar offsets.
+
+    Rules use Python expression syntax: fields (open, high, low, close,
+    body, upper_wick, lower_wick, range, mid) indexed by bars back
+    (`close[-1]` is the previous close, a bare field is the current bar),
+    arithmetic, comparisons (chains allowed), and/or/not, abs, max, min:
+
+        "close > open and close[-1] < open[-1] and body > 2 * body[-1]"
+
+    Each rule is parsed and compiled once. `evaluate` builds every field
+    and shifted copy the rule set needs a single time, shared by all
+    rules, then evaluates each rule as one compiled NumPy expression over
+    a series or a (symbols x bars) array. Adding a rule adds no per-bar
+    Python work.
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[str, float]] = None):
+        self.rules: Dict[str, PatternRule] = {}
+        for name, (expression, confidence) in (DEFAULT_RULES if rules is None else rules).items():
+            self.add(name, expression, confidence)
+
+    def add(self, name: str, expression: str, confidence: float) -> None:
+        """Compile and register a rule (replacing any rule with the same name)."""
+        self.rules[name] = PatternRule(name, expression, confidence)
+
+    def names(self) -> List[str]:
+        return list(self.rules)
+
+    def confidence(self, name: str) -> float:
+        return self.rules[name].confidence
+
+    @property
+    def lookback(self) -> int:
+        """Most bars back any rule looks (a rule set over the last lookback+1 bars sees every pattern)."""
+        return max((rule.lookback for rule in self.rules.values()), default=0)
+
+    def evaluate(self, open_, high, low, close) -> Dict[str, np.ndarray]:
+        """Mask per rule, True on the bar that completes the pattern; bars without enough history are False."""
+        prices = [np.asarray(x, dtype='float64') for x in (open_, high, low, close)]
+        needed = set().union(*(rule.columns for rule in self.rules.values())) if self.rules else set()
+
+        base = {field: FIELDS[field](*prices) for field in {field for field, _ in needed}}
+        env = {f"{field}_{back}": shift(base[field], back) if back else base[field]
+               for field, back in needed}
+
+        masks = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, rule in self.rules.items():
+                mask = np.asarray(eval(rule.code, _NAMESPACE, env), dtype=bool)
+                if mask.shape != prices[3].shape:  # rule without field references (e.g. "1 > 0")
+                    mask = np.broadcast_to(mask, prices[3].shape).copy()
+                mask[..., :rule.lookback] = False
+                masks[name] = mask
+        return masks
+
+
+# Rules used by PatternDetector unless it is given its own set
+default_rules = PatternRuleSet()
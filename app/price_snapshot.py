@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from config import PRICE_SNAPSHOT_MAX_AGE
+from app.rate_limiter import rate_limiter, PRIORITY_LIVE
+
+TICKER_ALL_WEIGHT = 4  # request weight of /ticker/price without a symbol
+
+
+class PriceSnapshot:
+    """
+    In-memory snapshot of every ticker price, refreshed with one bulk
+    `/ticker/price` call. Each entry carries the time it was fetched.
+
+    Reads are served from the dict while the entry is younger than
+    `max_age`. When it is stale, one caller refreshes and concurrent
+    callers wait for that same fetch instead of issuing their own.
+    """
+
+    def __init__(self, base_url: str, session=None, max_age: float = PRICE_SNAPSHOT_MAX_AGE, limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.limiter = limiter or rate_limiter
+        self.max_age = max_age
+        self.prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (price, fetched_at)
+        self.refreshes = 0
+        self.refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self.running = False
+
+    def refresh(self) -> None:
+        """Fetch all tickers in one request and replace the snapshot."""
+        response = self.limiter.request(self.session, f"{self.base_url}/ticker/price",
+                                        weight=TICKER_ALL_WEIGHT, priority=PRIORITY_LIVE, timeout=5)
+        response.raise_for_status()
+        fetched_at = time.time()
+        self.prices = {t["symbol"]: (float(t["price"]), fetched_at) for t in response.json()}
+        self.refreshed_at = fetched_at
+        self.refreshes += 1
+
+    def _fresh(self, entry) -> bool:
+        if entry is None:
+            # Unknown symbol: only worth another fetch once the whole snapshot is stale
+            return time.time() - self.refreshed_at < self.max_age
+        return time.time() - entry[1] < self.max_age
+
+    def get(self, symbol: str) -> Optional[Tuple[float, float]]:
+        """Return (price, fetched_at) for `symbol`, or None if the exchange has no such ticker."""
+        entry = self.prices.get(symbol)
+        if self._fresh(entry):
+            return entry
+
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            entry = self.prices.get(symbol)
+            if not self._fresh(entry):
+                self.refresh()
+                entry = self.prices.get(symbol)
+        return entry
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """Keep the snapshot warm from a background thread."""
+        interval = interval or self.max_age
+        self.running = True
+
+        def loop():
+            while self.running:
+                try:
+                    with self._refresh_lock:
+                        self.refresh()
+                except Exception as e:
+                    print(f"[Prices] Error refreshing ticker snapshot: {e}")
+                time.sleep(interval)
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
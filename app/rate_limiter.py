@@ -0,0 +1,128 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import List, Tuple
+
+from config import RATE_LIMIT_CONFIG
+
+# Lower number = served first when callers are waiting for weight
+PRIORITY_LIVE = 0
+PRIORITY_METADATA = 5
+PRIORITY_BACKFILL = 10
+
+USED_WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"
+BAN_STATUSES = (418, 429)  # 429 = over the limit, 418 = IP auto-banned for ignoring 429s
+
+
+class WeightRateLimiter:
+    """
+    Token bucket over exchange request weight, shared by every caller in
+    the process.
+
+    The bucket refills continuously at `weight_per_minute * headroom` per
+    minute and is corrected downwards from the used-weight header on every
+    response. A 429/418 blocks all callers for Retry-After (or an
+    exponential backoff) plus jitter. Waiting callers are served in
+    priority order, so live candles go ahead of backfill pages.
+    """
+
+    def __init__(self, weight_per_minute: int = RATE_LIMIT_CONFIG['weight_per_minute'],
+                 headroom: float = RATE_LIMIT_CONFIG['headroom'],
+                 base_backoff: float = 1.0, max_backoff: float = 120.0, max_retries: int = 3):
+        self.capacity = weight_per_minute * headroom
+        self.rate = self.capacity / 60.0  # weight per second
+        self.tokens = self.capacity
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.backoff = base_backoff
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self, weight: int) -> float:
+        """Seconds until `weight` can be spent (0 if now). Caller holds the lock."""
+        self._refill()
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens < weight:
+            return (weight - self.tokens) / self.rate
+        return 0.0
+
+    def acquire(self, weight: int = 1, priority: int = PRIORITY_LIVE) -> None:
+        """Block until `weight` is available and no more urgent caller is waiting."""
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = 0.1
+                    if self._waiting[0] == ticket:
+                        wait = self._wait_time(weight)
+                        if wait <= 0:
+                            self.tokens -= weight
+                            return
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    async def acquire_async(self, weight: int = 1, priority: int = PRIORITY_LIVE) -> None:
+        """Event-loop friendly `acquire`: yields instead of blocking while waiting."""
+        while True:
+            with self._cond:
+                if self._waiting and self._waiting[0][0] <= priority:
+                    wait = 0.05  # a thread of equal or higher priority is queued first
+                else:
+                    wait = self._wait_time(weight)
+                    if wait <= 0:
+                        self.tokens -= weight
+                        return
+            await asyncio.sleep(wait)
+
+    def update(self, status: int, headers) -> None:
+        """Feed a response back: sync to the used-weight header and back off on 429/418."""
+        with self._cond:
+            used = headers.get(USED_WEIGHT_HEADER)
+            if used is not None:
+                self._refill()
+                self.tokens = min(self.tokens, self.capacity - float(used))
+
+            if status in BAN_STATUSES:
+                retry_after = float(headers.get("Retry-After") or 0)
+                delay = max(retry_after, self.backoff) * random.uniform(1.0, 1.25)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                self.tokens = min(self.tokens, 0.0)
+                self.throttled += 1
+                print(f"[RateLimiter] HTTP {status}; pausing requests for {delay:.1f}s")
+            else:
+                self.backoff = self.base_backoff
+            self._cond.notify_all()
+
+    def request(self, session, url: str, weight: int = 1, priority: int = PRIORITY_LIVE, **kwargs):
+        """`session.get` under the limiter, retrying 429/418 after the backoff."""
+        for _ in range(self.max_retries + 1):
+            self.acquire(weight, priority)
+            response = session.get(url, **kwargs)
+            self.update(response.status_code, response.headers)
+            if response.status_code not in BAN_STATUSES:
+                break
+        return response
+
+
+# Shared by every collector, backfill and price call in the process
+rate_limiter = WeightRateLimiter()
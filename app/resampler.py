@@ -0,0 +1,114 @@
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.candle_store import INTERVAL_MS, candle_to_record
+
+DEFAULT_TIMEFRAMES = ("5m", "15m", "1h", "4h", "1d")
+BASE_INTERVAL = "1m"
+
+
+class Resampler:
+    """
+    Derives higher-timeframe candles from closed 1m candles as they arrive.
+
+    One partial bar is kept per (symbol, timeframe). Each closed 1m candle
+    is folded in (high/low extremes, last close, summed volume); a bar is
+    emitted as soon as its last minute arrives, or when a later minute
+    shows its bucket has passed. Buckets are aligned to the epoch, like
+    exchange klines (1d bars open at 00:00 UTC).
+
+    Each partial bar counts the minutes folded into it. A bucket that
+    closes with minutes missing (a fresh start mid-bucket, or minutes that
+    never arrived) would have the wrong open/high/low/volume, so it is
+    dropped instead of emitted.
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES):
+        unknown = [tf for tf in timeframes if tf not in INTERVAL_MS]
+        if unknown:
+            raise ValueError(f"Unsupported timeframes: {unknown}")
+        self.timeframes = tuple(timeframes)
+        self._partial: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._last_minute: Dict[str, int] = {}
+
+    @staticmethod
+    def _bucket(ts: int, timeframe: str) -> int:
+        return ts - ts % INTERVAL_MS[timeframe]
+
+    def seed(self, symbol: str, records: np.ndarray) -> None:
+        """
+        Rebuild the partial bars from stored 1m records (e.g. after a
+        restart) so the first bar of each timeframe can still be complete.
+        """
+        if len(records) == 0:
+            return
+        timestamps = records["timestamp"]
+        newest = int(timestamps[-1])
+        for timeframe in self.timeframes:
+            start = self._bucket(newest, timeframe)
+            rows = records[timestamps >= start]
+            if len(rows) == 0 or newest + INTERVAL_MS[BASE_INTERVAL] == start + INTERVAL_MS[timeframe]:
+                continue  # nothing in the current bucket, or it already closed
+            self._partial[(symbol, timeframe)] = {
+                "timestamp": start,
+                "open": float(rows["open"][0]),
+                "high": float(rows["high"].max()),
+                "low": float(rows["low"].min()),
+                "close": float(rows["close"][-1]),
+                "volume": float(rows["volume"].sum()),
+                "minutes": len(rows),
+            }
+        self._last_minute[symbol] = newest
+
+    def add(self, symbol: str, candle: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Fold in one closed 1m candle; returns the (timeframe, bar) pairs that closed."""
+        ts, open_, high, low, close, volume = candle_to_record(candle)
+        if ts <= self._last_minute.get(symbol, -1):
+            return []  # already folded in (polling re-delivers the previous candle)
+        self._last_minute[symbol] = ts
+
+        closed = []
+        for timeframe in self.timeframes:
+            key = (symbol, timeframe)
+            bucket = self._bucket(ts, timeframe)
+            bar = self._partial.get(key)
+
+            if bar is not None and bar["timestamp"] != bucket:
+                self._close(symbol, timeframe, self._partial.pop(key), closed)
+                bar = None
+
+            if bar is None:
+                bar = {"timestamp": bucket, "open": open_, "high": high,
+                       "low": low, "close": close, "volume": volume, "minutes": 1}
+                self._partial[key] = bar
+            else:
+                bar["high"] = max(bar["high"], high)
+                bar["low"] = min(bar["low"], low)
+                bar["close"] = close
+                bar["volume"] += volume
+                bar["minutes"] += 1
+
+            if ts + INTERVAL_MS[BASE_INTERVAL] == bucket + INTERVAL_MS[timeframe]:
+                self._close(symbol, timeframe, self._partial.pop(key), closed)
+        return closed
+
+    def _close(self, symbol: str, timeframe: str, bar: Dict[str, Any], closed: list) -> None:
+        expected = INTERVAL_MS[timeframe] // INTERVAL_MS[BASE_INTERVAL]
+        if bar["minutes"] < expected:
+            print(f"[Resampler] Dropping incomplete {symbol} {timeframe} bar at "
+                  f"{pd.to_datetime(bar['timestamp'], unit='ms')} ({bar['minutes']}/{expected} minutes)")
+            return
+        closed.append((timeframe, self._emit(bar)))
+
+    @staticmethod
+    def _emit(bar: Dict[str, Any]) -> Dict[str, Any]:
+        candle = {k: v for k, v in bar.items() if k != "minutes"}
+        candle["timestamp"] = pd.to_datetime(bar["timestamp"], unit="ms")
+        return candle
+
+    def partial(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        """The still-forming bar for a timeframe, if any."""
+        bar = self._partial.get((symbol, timeframe))
+        return self._emit(bar) if bar else None
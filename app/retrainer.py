@@ -66,9 +66,12 @@ class Retrainer:
                 return
 
             print(f"[Retrainer] Retraining pattern model with {len(data_files)} files...")
-            pattern_model = PatternDetector()
+            pattern_model = PatternDetector().model
+            if pattern_model is None:
+                print("[Retrainer] No pattern model loaded; nothing to save.")
+                return
             model_path = os.path.join(MODELS_DIR, f"pattern_model_{datetime.now().strftime('%Y%m%d')}.pkl")
-            joblib.dump(pattern_model, model_path)
+            self._save(pattern_model, model_path)
             print(f"[Retrainer] Pattern model saved → {model_path}")
 
         except Exception as e:
@@ -85,14 +88,27 @@ class Retrainer:
                 return
 
             print(f"[Retrainer] Retraining market model with {len(data_files)} files...")
-            market_model = MarketClassifier()
+            market_model = MarketClassifier().model
+            if market_model is None:
+                print("[Retrainer] No market model loaded; nothing to save.")
+                return
             model_path = os.path.join(MODELS_DIR, f"market_model_{datetime.now().strftime('%Y%m%d')}.pkl")
-            joblib.dump(market_model, model_path)
+            self._save(market_model, model_path)
             print(f"[Retrainer] Market model saved → {model_path}")
 
         except Exception as e:
             print(f"[Retrainer] Error retraining market model: {e}")
 
+    @staticmethod
+    def _save(model, path: str):
+        """
+        Write the bare model (as the training scripts do), not the
+        detector/classifier holding it: those now keep locks and store
+        handles that cannot be pickled, and read the model from the registry.
+        """
+        joblib.dump(model, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
     def _get_recent_data_files(self, directory: str, days: int = 30):
         """
         Return CSV files modified within last N days.
@@ -0,0 +1,84 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+
+def next_boundary(now: float, period: float) -> float:
+    """First multiple of `period` (epoch seconds) strictly after `now`."""
+    return (int(now // period) + 1) * period
+
+
+class IntervalScheduler:
+    """
+    Runs periodic jobs just after their interval boundary.
+
+    Due times are kept in a heap and always computed from the boundary
+    grid (never from when the previous run finished), so slow jobs do not
+    make the schedule drift. Jobs run on a thread pool; a job that is still
+    running when it comes due again is skipped for that boundary instead
+    of piling up. Each job gets a fixed offset inside `spread` seconds so
+    hundreds of pairs do not all fire in the same instant.
+    """
+
+    def __init__(self, workers: int = 8, settle: float = 1.0, spread: float = 5.0):
+        self.workers = workers
+        self.settle = settle    # wait after the boundary so the exchange has closed the candle
+        self.spread = spread    # window over which job start times are staggered
+        self.running = False
+        self._jobs: List[Tuple[str, float, Callable[[], None]]] = []
+        self._heap: List[Tuple[float, int, int]] = []
+        self._seq = itertools.count()
+        self._busy: Dict[int, bool] = {}
+        self._wakeup = threading.Event()
+
+    def add(self, name: str, period: float, fn: Callable[[], None]) -> None:
+        """Register `fn` to run every `period` seconds, aligned to the period grid."""
+        self._jobs.append((name, period, fn))
+
+    def _offset(self, index: int) -> float:
+        return self.settle + self.spread * index / max(len(self._jobs), 1)
+
+    def _run_job(self, index: int) -> None:
+        name, _, fn = self._jobs[index]
+        try:
+            fn()
+        except Exception as e:
+            print(f"[Scheduler] Job {name} failed: {e}")
+        finally:
+            self._busy[index] = False
+
+    def run(self) -> None:
+        """Blocking loop; returns after `stop()`."""
+        self.running = True
+        now = time.time()
+        for index, (_, period, _) in enumerate(self._jobs):
+            due = next_boundary(now - self._offset(index), period) + self._offset(index)
+            heapq.heappush(self._heap, (due, next(self._seq), index))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while self.running and self._heap:
+                due, _, index = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    continue
+
+                heapq.heappop(self._heap)
+                name, period, _ = self._jobs[index]
+                if self._busy.get(index):
+                    print(f"[Scheduler] Job {name} still running; skipping this boundary")
+                else:
+                    self._busy[index] = True
+                    pool.submit(self._run_job, index)
+                next_due = due + period
+                if next_due <= time.time():
+                    # Fell more than a period behind (e.g. host suspended): realign to the grid
+                    next_due = next_boundary(time.time() - self._offset(index), period) + self._offset(index)
+                heapq.heappush(self._heap, (next_due, next(self._seq), index))
+
+    def stop(self) -> None:
+        self.running = False
+        self._wakeup.set()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from typing import Optional, Tuple
+
+import pandas as pd
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443"
+
+
+class KlineStream:
+    """
+    Streaming ingestion of closed klines over Binance combined streams.
+
+    Subscribes to `<symbol>@kline_<interval>` for every configured pair of
+    the collector and hands each closed candle to `Collector.save_candle`
+    and shared state as soon as it arrives. The connection is re-opened
+    (and therefore resubscribed) with exponential backoff whenever it
+    drops. Raw messages can be recorded to a JSONL file and replayed later
+    without a network connection (replay skips gap repair).
+    """
+
+    def __init__(self, collector, ws_url=BINANCE_WS_URL, record_path: Optional[str] = None,
+                 max_backoff: float = 60.0):
+        self.collector = collector
+        self.ws_url = ws_url.rstrip("/")
+        self.record_path = record_path
+        self.max_backoff = max_backoff
+        self.running = False
+        self.closed_candles = 0
+
+    @property
+    def url(self) -> str:
+        streams = "/".join(
+            f"{symbol.lower()}@kline_{interval}"
+            for symbol in self.collector.symbols
+            for interval in self.collector.intervals
+        )
+        return f"{self.ws_url}/stream?streams={streams}"
+
+    @staticmethod
+    def parse_message(raw: str) -> Optional[Tuple[str, str, dict]]:
+        """(symbol, interval, candle) for a kline message whose candle just closed, else None."""
+        message = json.loads(raw)
+        data = message.get("data", message)
+        if data.get("e") != "kline":
+            return None
+
+        kline = data["k"]
+        if not kline.get("x"):
+            return None  # candle still forming
+
+        candle = {
+            "timestamp": pd.to_datetime(kline["t"], unit="ms"),
+            "open": float(kline["o"]),
+            "high": float(kline["h"]),
+            "low": float(kline["l"]),
+            "close": float(kline["c"]),
+            "volume": float(kline["v"]),
+            "closed": True,
+        }
+        return data["s"], kline["i"], candle
+
+    def _publish(self, symbol: str, interval: str, candle: dict) -> dict:
+        self.collector.shared_state[f"{symbol}_{interval}"] = candle
+        self.closed_candles += 1
+        return candle
+
+    def handle_message(self, raw: str, repair: bool = True) -> Optional[dict]:
+        """
+        Process one combined-stream message; returns the candle if it just
+        closed. With `repair=False` gaps before it are not fetched.
+        """
+        parsed = self.parse_message(raw)
+        if parsed is None:
+            return None
+        self.collector.save_candle(*parsed, repair=repair)
+        return self._publish(*parsed)
+
+    async def handle_message_async(self, raw: str) -> Optional[dict]:
+        """`handle_message` on the event loop: a gap repair runs off the loop (see Collector.save_candle_async)."""
+        parsed = self.parse_message(raw)
+        if parsed is None:
+            return None
+        await self.collector.save_candle_async(*parsed)
+        return self._publish(*parsed)
+
+    async def run(self):
+        """Consume the stream until `stop()`; reconnects with backoff on any error."""
+        if websockets is None:
+            raise RuntimeError("websockets is not installed; streaming mode is unavailable")
+
+        self.running = True
+        backoff = min(1.0, self.max_backoff)
+        record = open(self.record_path, "a", buffering=1) if self.record_path else None  # line-buffered
+        try:
+            while self.running:
+                try:
+                    async with websockets.connect(self.url, ping_interval=20) as ws:
+                        print(f"[Stream] Connected: {len(self.collector.symbols)} symbols x "
+                              f"{len(self.collector.intervals)} intervals")
+                        backoff = min(1.0, self.max_backoff)
+                        async for raw in ws:
+                            if record:
+                                record.write(raw + "\n")
+                            await self.handle_message_async(raw)
+                            if not self.running:
+                                break
+                    reason = "closed by server"
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    reason = str(e)
+                if not self.running:
+                    break
+                print(f"[Stream] Connection lost ({reason}); reconnecting in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            if record:
+                record.close()
+
+    def replay(self, path: str) -> int:
+        """
+        Feed a recorded JSONL stream through the handler; returns closed
+        candles seen. Gaps are not repaired, so a replay makes no network
+        calls whatever the target store already holds: it reproduces
+        exactly the recorded candles.
+        """
+        closed = 0
+        with open(path) as f:
+            for line in f:
+                if line.strip() and self.handle_message(line, repair=False) is not None:
+                    closed += 1
+        return closed
+
+    def stop(self):
+        self.running = False
+        print("[Stream] Stopped.")
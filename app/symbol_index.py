@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional
+
+import requests
+from config import EXCHANGE_INFO_CACHE_PATH, EXCHANGE_INFO_TTL, EXCHANGE_INFO_RETRY
+from app.rate_limiter import rate_limiter, PRIORITY_METADATA
+
+EXCHANGE_INFO_WEIGHT = 20  # request weight of a full /exchangeInfo call
+
+# Everyday names people use for the big coins (base asset -> names)
+COMMON_NAMES = {
+    "BTC": ["bitcoin"],
+    "ETH": ["ethereum", "ether"],
+    "BNB": ["binance coin"],
+    "SOL": ["solana"],
+    "XRP": ["ripple"],
+    "ADA": ["cardano"],
+    "DOGE": ["dogecoin"],
+    "DOT": ["polkadot"],
+    "TRX": ["tron"],
+    "LTC": ["litecoin"],
+    "LINK": ["chainlink"],
+    "AVAX": ["avalanche"],
+    "MATIC": ["polygon"],
+    "SHIB": ["shiba inu", "shiba"],
+    "XLM": ["stellar"],
+    "ATOM": ["cosmos"],
+    "UNI": ["uniswap"],
+    "NEAR": ["near protocol"],
+    "TON": ["toncoin"],
+    "PEPE": ["pepe coin"],
+}
+
+# English words that are also tickers ("the", "one", "hot"...): only matched as full tickers
+STOPWORDS = {
+    "a", "ai", "all", "an", "and", "any", "are", "at", "be", "big", "buy", "can", "coin", "d", "do",
+    "dog", "dogs", "for", "fun", "gas", "get", "go", "high", "hot", "how", "i", "in", "is", "it",
+    "key", "ll", "low", "m", "me", "more", "move", "my", "new", "not", "now", "of", "on", "one",
+    "or", "out", "price", "pump", "rate", "re", "s", "sell", "show", "so", "sun", "t", "the", "to",
+    "top", "up", "us", "ve", "was", "what", "when", "who", "why", "will", "win", "you",
+}
+
+# Shortest base asset matched on its own; shorter ones ("s", "t") only match as full tickers
+MIN_BASE_ALIAS = 2
+
+# Match strength: full ticker beats a common name, which beats a bare base asset
+_TICKER, _NAME, _BASE = 3, 2, 1
+
+
+class ExchangeMetadata:
+    """
+    Lazily loaded exchangeInfo, cached on disk and in memory with a TTL.
+    A stale cache is still used if the exchange cannot be reached; an
+    empty or failed result is never kept, and the fetch is retried after
+    `retry_delay` seconds.
+    """
+
+    def __init__(self, base_url: str, cache_path: str = EXCHANGE_INFO_CACHE_PATH,
+                 ttl: float = EXCHANGE_INFO_TTL, session=None, limiter=None,
+                 retry_delay: float = EXCHANGE_INFO_RETRY):
+        self.base_url = base_url.rstrip("/")
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self.session = session or requests.Session()
+        self.limiter = limiter or rate_limiter
+        self._symbols: Optional[List[Dict[str, Any]]] = None
+        self._expires = 0.0  # epoch seconds after which symbols() reloads
+
+    def _read_cache(self) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cache_fresh(self) -> bool:
+        return (os.path.exists(self.cache_path)
+                and time.time() - os.path.getmtime(self.cache_path) < self.ttl)
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        """Download exchangeInfo and rewrite the cache file atomically."""
+        response = self.limiter.request(self.session, f"{self.base_url}/exchangeInfo",
+                                        weight=EXCHANGE_INFO_WEIGHT, priority=PRIORITY_METADATA, timeout=10)
+        response.raise_for_status()
+        symbols = [
+            {
+                "symbol": s["symbol"],
+                "baseAsset": s.get("baseAsset", ""),
+                "quoteAsset": s.get("quoteAsset", ""),
+                "status": s.get("status", "TRADING"),
+            }
+            for s in response.json()["symbols"]
+        ]
+        if not symbols:
+            raise ValueError("exchangeInfo listed no symbols")
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(symbols, f)
+        os.replace(tmp_path, self.cache_path)
+        return symbols
+
+    def symbols(self) -> List[Dict[str, Any]]:
+        """
+        The symbol list, reloaded once the TTL has passed. Returns a new
+        list object whenever it was reloaded, and [] if nothing is known.
+        """
+        now = time.time()
+        if now < self._expires:
+            return self._symbols or []
+
+        symbols = self._read_cache() if self._cache_fresh() else None
+        if symbols:
+            self._expires = os.path.getmtime(self.cache_path) + self.ttl
+        else:
+            try:
+                symbols = self.fetch()
+                self._expires = now + self.ttl
+            except Exception as e:
+                print(f"[Symbols] Error fetching exchange info, using cached copy: {e}")
+                symbols = self._read_cache()
+                self._expires = now + self.retry_delay
+        if symbols:
+            self._symbols = symbols
+        return self._symbols or []
+
+
+class SymbolIndex:
+    """
+    Resolves free-text queries ("eth price", "how is bitcoin") to tickers.
+
+    Aliases (full tickers, base assets and common names) live in a
+    character trie; the query is scanned once from every word start and
+    only aliases ending on a word boundary count, so "eth" never matches
+    ETHFIUSDT. The strongest match wins; between equally strong matches the
+    longer alias does, then the earlier one (the first full ticker ends
+    the scan).
+    """
+
+    _END = "\0"
+
+    def __init__(self, symbols: List[Dict[str, Any]], quote_asset: str = "USDT"):
+        self.symbols = [
+            s["symbol"] for s in symbols
+            if s.get("quoteAsset") == quote_asset and s.get("status", "TRADING") == "TRADING"
+        ]
+        tradable = set(self.symbols)
+        self._trie: Dict[str, Any] = {}
+        for s in symbols:
+            if s["symbol"] not in tradable:
+                continue
+            base = s.get("baseAsset") or s["symbol"][:-len(quote_asset)]
+            self._add(s["symbol"].lower(), s["symbol"], _TICKER)
+            if len(base) >= MIN_BASE_ALIAS and base.lower() not in STOPWORDS:
+                self._add(base.lower(), s["symbol"], _BASE)
+            for name in COMMON_NAMES.get(base, []):
+                self._add(name, s["symbol"], _NAME)
+
+    def _add(self, alias: str, symbol: str, strength: int):
+        node = self._trie
+        for ch in alias:
+            node = node.setdefault(ch, {})
+        current = node.get(self._END)
+        if current is None or current[1] < strength:
+            node[self._END] = (symbol, strength)
+
+    def resolve(self, query: str) -> Optional[str]:
+        """Return the best-matching ticker in `query`, or None."""
+        text = re.sub(r"[^a-z0-9]+", " ", query.lower()).strip()
+        best = None
+        for match in re.finditer(r"[a-z0-9]+", text):
+            node = self._trie
+            for pos in range(match.start(), len(text)):
+                node = node.get(text[pos])
+                if node is None:
+                    break
+                at_boundary = pos + 1 == len(text) or text[pos + 1] == " "
+                if at_boundary and self._END in node:
+                    symbol, strength = node[self._END]
+                    rank = (strength, pos + 1 - match.start())
+                    if best is None or rank > best[1]:
+                        best = (symbol, rank)
+            if best is not None and best[1][0] == _TICKER:
+                break
+        return best[0] if best else None
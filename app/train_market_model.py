@@ -6,7 +6,9 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 import os
-from config import MARKET_MODEL_PATH
+from config import MARKET_MODEL_PATH, MARKET_COMPILED_MODEL_PATH
+from app.compiled_forest import CompiledForest
+from app.model_registry import file_signature
 
 class MarketModelTrainer:
     def __init__(self):
@@ -42,8 +44,15 @@ class MarketModelTrainer:
         print(f"Model accuracy: {accuracy:.2f}")
         
         # Save model
-        joblib.dump(self.model, MARKET_MODEL_PATH)
+        # Write then rename, so the model registry never picks up a half-written file
+        joblib.dump(self.model, f"{MARKET_MODEL_PATH}.tmp")
+        os.replace(f"{MARKET_MODEL_PATH}.tmp", MARKET_MODEL_PATH)
         print(f"Model saved to {MARKET_MODEL_PATH}")
+
+        # Flattened copy used by MarketClassifier for low-latency inference
+        CompiledForest.from_sklearn(self.model, source_signature=file_signature(MARKET_MODEL_PATH)).save(
+            MARKET_COMPILED_MODEL_PATH)
+        print(f"Compiled model saved to {MARKET_COMPILED_MODEL_PATH}")
         
         return accuracy
 
@@ -56,7 +56,9 @@ class PatternModelTrainer:
         print(f"Model accuracy: {accuracy:.2f}")
         
         # Save model
-        joblib.dump(self.model, PATTERN_MODEL_PATH)
+        # Write then rename, so the model registry never picks up a half-written file
+        joblib.dump(self.model, f"{PATTERN_MODEL_PATH}.tmp")
+        os.replace(f"{PATTERN_MODEL_PATH}.tmp", PATTERN_MODEL_PATH)
         print(f"Model saved to {PATTERN_MODEL_PATH}")
         
         return accuracy
@@ -0,0 +1,52 @@
+# benchmarks/indicators.py
+# Throughput of the NumPy indicator kernels (reference values are checked in
+# tests/test_indicator_math.py).
+#
+#   python -m benchmarks.indicators                  # 1k..10M bars
+#   python -m benchmarks.indicators --sizes 1000 100000
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+from app.indicator_engine import IndicatorGraph
+from benchmarks.synthetic import synthetic_ohlcv
+
+EXTENDED_INDICATORS = ('rsi_wilder', 'stoch_k', 'stoch_d', 'plus_di', 'minus_di', 'adx', 'vwap',
+                       'obv', 'keltner_upper', 'keltner_lower', 'tenkan_sen', 'kijun_sen',
+                       'senkou_span_a', 'senkou_span_b', 'chikou_span')
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def throughput(sizes=DEFAULT_SIZES, repeat: int = 3):
+    """Best-of-`repeat` wall time per indicator (with its dependencies) for each series length."""
+    graph = IndicatorGraph()
+    results = []
+    for bars in sizes:
+        data = synthetic_ohlcv(bars)
+        for name in EXTENDED_INDICATORS:
+            best = math.inf
+            for _ in range(repeat if bars < 1_000_000 else 1):
+                start = time.perf_counter()
+                graph.evaluate(data, (name,))
+                best = min(best, time.perf_counter() - start)
+            results.append({'indicator': name, 'bars': bars, 'seconds': best,
+                            'bars_per_second': bars / best if best else math.inf})
+            print(f"[Benchmark] {name:<14} {bars:>10,} bars  {best * 1000:9.2f} ms  "
+                  f"{bars / best / 1e6:8.1f} M bars/s")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Indicator throughput benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    args = parser.parse_args(argv)
+
+    throughput(args.sizes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# benchmarks/pipeline.py
+# Latency/memory benchmark for the analysis hot path, with baseline comparison.
+#
+#   python -m benchmarks.pipeline                         # default grid, saves results/<time>.json
+#   python -m benchmarks.pipeline --bars 1000 --symbols 1 50 --iterations 50
+#   python -m benchmarks.pipeline --update-baseline       # store this run as the baseline
+#   python -m benchmarks.pipeline --baseline benchmarks/baseline.json --tolerance 0.2
+#
+# Each stage is timed over the whole synthetic universe per iteration (one
+# call per symbol, as the live loop does). Peak memory is measured in a
+# separate traced run so tracemalloc overhead does not skew the timings.
+# A stage regresses when its p50 exceeds the baseline p50 by more than
+# `tolerance`; the exit status is then 1.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.indicator_engine import IndicatorEngine
+from app.market_classifier import MarketClassifier
+from app.pattern_detector import PatternDetector
+from app.signal_generator import SignalGenerator
+from app.strategy_selector import StrategySelector
+from benchmarks.synthetic import synthetic_frames
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+DEFAULT_BARS = (200, 1_000, 10_000)
+DEFAULT_SYMBOLS = (1, 10, 100)
+PERCENTILES = (50, 90, 99)
+
+
+class PipelineBenchmark:
+    """
+    Times each analysis stage, and the indicators -> classify -> select ->
+    signal chain, over `symbols` synthetic series of `bars` candles.
+    Stage inputs are computed once up front so every stage is timed alone.
+    """
+
+    def __init__(self, symbols: int, bars: int, seed: int = 7):
+        self.symbols = symbols
+        self.bars = bars
+        self.frames = synthetic_frames(symbols, bars, seed)
+        self.engine = IndicatorEngine()
+        self.detector = PatternDetector()
+        self.classifier = MarketClassifier()
+        self.selector = StrategySelector()
+        self.generator = SignalGenerator()
+
+        self.indicators = {s: self.engine.calculate_indicators(df) for s, df in self.frames.items()}
+        self.conditions = {s: self.classifier.classify_market(df, self.indicators[s])
+                           for s, df in self.frames.items()}
+        self.strategies = {s: self.selector.select_strategy(self.conditions[s], self.indicators[s])
+                           for s in self.frames}
+
+        self.stages = {
+            'indicators': self._indicators,
+            'pattern_features': self._pattern_features,
+            'patterns': self._patterns,
+            'market_features': self._market_features,
+            'classify': self._classify,
+            'select': self._select,
+            'signal': self._signal,
+            'chain': self._chain,
+        }
+
+    def _indicators(self):
+        for df in self.frames.values():
+            self.engine.calculate_indicators(df)  # no symbol/interval: bypasses the result cache
+
+    def _pattern_features(self):
+        for df in self.frames.values():
+            self.detector.extract_features(df)
+
+    def _patterns(self):
+        for df in self.frames.values():
+            self.detector.predict_patterns(df)
+
+    def _market_features(self):
+        for symbol, df in self.frames.items():
+            self.classifier.extract_features(df, self.indicators[symbol])
+
+    def _classify(self):
+        for symbol, df in self.frames.items():
+            self.classifier.classify_market(df, self.indicators[symbol])
+
+    def _select(self):
+        for symbol in self.frames:
+            self.selector.select_strategy(self.conditions[symbol], self.indicators[symbol])
+
+    def _signal(self):
+        for symbol, df in self.frames.items():
+            self.generator.generate_signals(self.strategies[symbol], df, self.indicators[symbol])
+
+    def _chain(self):
+        for df in self.frames.values():
+            indicators = self.engine.calculate_indicators(df)
+            condition = self.classifier.classify_market(df, indicators)
+            strategy = self.selector.select_strategy(condition, indicators)
+            self.generator.generate_signals(strategy, df, indicators)
+
+    def run_stage(self, name: str, iterations: int, warmup: int = 2):
+        fn = self.stages[name]
+        for _ in range(warmup):
+            fn()
+
+        samples = np.empty(iterations)
+        for i in range(iterations):
+            start = time.perf_counter()
+            fn()
+            samples[i] = time.perf_counter() - start
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        ms = samples * 1000
+        result = {
+            'stage': name, 'symbols': self.symbols, 'bars': self.bars, 'iterations': iterations,
+            'mean_ms': float(ms.mean()), 'min_ms': float(ms.min()), 'max_ms': float(ms.max()),
+            'per_symbol_ms': float(np.median(ms)) / self.symbols, 'peak_memory_kb': peak / 1024,
+        }
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = float(np.percentile(ms, p))
+        return result
+
+
+def run(bars=DEFAULT_BARS, symbols=DEFAULT_SYMBOLS, iterations: int = 20, stages=None):
+    results = []
+    for n_symbols in symbols:
+        for n_bars in bars:
+            bench = PipelineBenchmark(n_symbols, n_bars)
+            for name in stages or bench.stages:
+                result = bench.run_stage(name, iterations)
+                results.append(result)
+                print(f"[Benchmark] {name:<17} {n_symbols:>4} sym x {n_bars:>6} bars  "
+                      f"p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+                      f"peak {result['peak_memory_kb']:9.1f} KiB")
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def save(report, path: str = None) -> str:
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def compare(report, baseline, tolerance: float = 0.25):
+    """Rows of (stage, symbols, bars, baseline p50, current p50, ratio, regressed) for shared configs."""
+    reference = {(r['stage'], r['symbols'], r['bars']): r for r in baseline['results']}
+    rows = []
+    for result in report['results']:
+        key = (result['stage'], result['symbols'], result['bars'])
+        if key not in reference:
+            continue
+        before, after = reference[key]['p50_ms'], result['p50_ms']
+        ratio = after / before if before > 0 else float('inf')
+        rows.append((*key, before, after, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Analysis pipeline benchmark")
+    parser.add_argument("--bars", type=int, nargs="+", default=list(DEFAULT_BARS))
+    parser.add_argument("--symbols", type=int, nargs="+", default=list(DEFAULT_SYMBOLS))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--stages", nargs="+", help="subset of stages to run")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run(args.bars, args.symbols, args.iterations, args.stages)
+    print(f"[Benchmark] Results saved to {save(report, args.output)}")
+
+    if args.update_baseline:
+        print(f"[Benchmark] Baseline updated: {save(report, args.baseline)}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"[Benchmark] No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        rows = compare(report, json.load(f), args.tolerance)
+    regressions = [row for row in rows if row[-1]]
+    for stage, n_symbols, n_bars, before, after, ratio, regressed in rows:
+        print(f"[Benchmark] {stage:<17} {n_symbols:>4} sym x {n_bars:>6} bars  "
+              f"{before:9.3f} -> {after:9.3f} ms  x{ratio:5.2f}{'  REGRESSION' if regressed else ''}")
+    print(f"[Benchmark] {len(rows)} compared, {len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
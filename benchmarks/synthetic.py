@@ -0,0 +1,37 @@
+# benchmarks/synthetic.py
+# Deterministic synthetic OHLCV data for the benchmarks.
+import numpy as np
+import pandas as pd
+
+BAR_MS = 60_000
+
+
+def synthetic_ohlcv(bars: int, seed: int = 7):
+    """Random-walk OHLCV arrays, with a few flat bars so the zero-range/zero-move paths run."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, bars))
+    close[bars // 3: bars // 3 + 20] = close[bars // 3]
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.3, bars))
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    high[bars // 3: bars // 3 + 20] = low[bars // 3: bars // 3 + 20] = close[bars // 3]
+    volume = rng.uniform(1, 100, bars)
+    return {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+
+def synthetic_universe(symbols: int, bars: int, seed: int = 7):
+    """(symbols x bars) OHLCV arrays, one independent random walk per symbol."""
+    series = [synthetic_ohlcv(bars, seed + i) for i in range(symbols)]
+    return {column: np.stack([s[column] for s in series]) for column in series[0]}
+
+
+def synthetic_frames(symbols: int, bars: int, seed: int = 7):
+    """{symbol: DataFrame} with the candle-store column layout (timestamp + OHLCV)."""
+    universe = synthetic_universe(symbols, bars, seed)
+    timestamps = pd.to_datetime(np.arange(bars, dtype='int64') * BAR_MS, unit='ms')
+    return {
+        f"SYM{i:04d}USDT": pd.DataFrame({'timestamp': timestamps,
+                                         **{column: values[i] for column, values in universe.items()}})
+        for i in range(symbols)
+    }
@@ -8,13 +8,36 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 LIVE_CANDLES_DIR = os.path.join(DATA_DIR, 'live_candles')
 TRADE_LOGS_DIR = os.path.join(DATA_DIR, 'trade_logs')
 INDICATOR_HISTORY_DIR = os.path.join(DATA_DIR, 'indicator_history')
+CANDLE_STORE_DIR = os.path.join(DATA_DIR, 'candles')
+EXCHANGE_INFO_CACHE_PATH = os.path.join(DATA_DIR, 'exchange_info.json')
+
+# Exchange metadata cache lifetime (seconds)
+EXCHANGE_INFO_TTL = 6 * 3600
+# Seconds before a failed exchange metadata fetch is retried
+EXCHANGE_INFO_RETRY = 60
+
+# Max age (seconds) of a bulk ticker snapshot before price queries refresh it
+PRICE_SNAPSHOT_MAX_AGE = 2
+
+# Candle store retention (rows kept per symbol/interval ring file)
+CANDLE_STORE_RETENTION = 50000
+
+# In-memory candle cache (bars kept per symbol/interval)
+CANDLE_CACHE_SIZE = 1000
+
+# Memory budget for IndicatorEngine's result cache (bytes)
+INDICATOR_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
 # Model paths
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 PATTERN_MODEL_PATH = os.path.join(MODELS_DIR, 'pattern_model.pkl')
 MARKET_MODEL_PATH = os.path.join(MODELS_DIR, 'market_model.pkl')
+MARKET_COMPILED_MODEL_PATH = os.path.join(MODELS_DIR, 'market_model_compiled.pkl')  # flattened export of the market model
 STRATEGY_MODEL_PATH = os.path.join(MODELS_DIR, 'strategy_model.pkl')
 
+# Seconds between model file checks for hot reload (0 disables the watcher)
+MODEL_RELOAD_INTERVAL = 30
+
 # Bybit API configuration
 BYBIT_CONFIG = {
     'testnet': True,
@@ -27,6 +50,25 @@ SYMBOLS = ['BTCUSDT', 'ETHUSDT']
 INTERVALS = ['15', '60']
 INITIAL_BALANCE = 10000  # USD
 
+# Live candle collector
+COLLECTOR_CONFIG = {
+    'mode': 'async',        # 'stream' (websocket), 'async' (concurrent polling) or 'sync' (interval-aligned scheduler)
+    'symbols': None,        # None = collector defaults
+    'intervals': None,      # None = collector defaults (1m only)
+    'derived_intervals': ['5m', '15m', '1h', '4h', '1d'],  # resampled from 1m, never fetched
+    'concurrency': 20,      # max in-flight requests in async mode
+    'poll_interval': 60,    # seconds between collection cycles, aligned to that grid (async mode)
+    'settle_delay': 1.0,    # seconds after a candle boundary before fetching (async and sync modes)
+    'spread': 5.0,          # seconds over which scheduled fetches are staggered (sync mode)
+    'ws_url': 'wss://stream.binance.com:9443',  # combined-stream endpoint (stream mode)
+}
+
+# Exchange request-weight budget shared by all API callers
+RATE_LIMIT_CONFIG = {
+    'weight_per_minute': 6000,  # Binance REQUEST_WEIGHT limit per IP
+    'headroom': 0.9,            # fraction of the limit we allow ourselves to use
+}
+
 # Telegram bot configuration
 TELEGRAM_CONFIG = {
     'token': 'bot_toke',
@@ -34,5 +76,5 @@ TELEGRAM_CONFIG = {
 }
 
 # Create directories if they don't exist
-for directory in [LIVE_CANDLES_DIR, TRADE_LOGS_DIR, INDICATOR_HISTORY_DIR, MODELS_DIR]:
+for directory in [LIVE_CANDLES_DIR, TRADE_LOGS_DIR, INDICATOR_HISTORY_DIR, CANDLE_STORE_DIR, MODELS_DIR]:
     os.makedirs(directory, exist_ok=True)
@@ -70,6 +70,7 @@ def main():
         'positions': {},
         'trade_history': [],
         'market_condition': None,
+        'market_conditions': {},  # symbol -> latest regime (MarketClassifier.classify_batch)
         'strategy_performance': {}
     }
 
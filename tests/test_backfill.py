@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+from app.backfill import Backfiller
+from app.candle_cache import CandleCache
+from app.candle_store import CandleStore, INTERVAL_MS
+from app.collector import Collector
+from app.rate_limiter import WeightRateLimiter
+
+STEP = INTERVAL_MS["1m"]
+END = (int(time.time() * 1000) // STEP - 10) * STEP  # a closed minute
+
+
+class KlineServer:
+    """Stand-in for the /klines endpoint: one 1m candle per minute, close = minute number."""
+
+    def __init__(self):
+        self.requests = []
+        self.fail_on = set()  # request numbers (1-based) answered with HTTP 500
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = {k: int(v[0]) if v[0].isdigit() else v[0]
+                         for k, v in parse_qs(urlparse(self.path).query).items()}
+                server.requests.append(query)
+                if len(server.requests) in server.fail_on:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                first = -(-query["startTime"] // STEP) * STEP
+                rows = [[t, "1", "2", "0.5", str(t // STEP), "3", t + STEP - 1]
+                        for t in range(first, query["endTime"] + 1, STEP)][:query["limit"]]
+                body = json.dumps(rows).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/v3"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = KlineServer()
+    yield server
+    server.close()
+
+
+def make_backfiller(server, root):
+    return Backfiller(CandleStore(str(root), retention=10_000), base_url=server.url, workers=2,
+                      batch_size=1000, limiter=WeightRateLimiter(max_retries=0))
+
+
+def assert_contiguous(records, start, end):
+    assert records["timestamp"][0] == start
+    assert records["timestamp"][-1] == end
+    assert np.all(np.diff(records["timestamp"]) == STEP)
+    assert np.array_equal(records["close"], records["timestamp"] // STEP)
+
+
+def test_pages_through_range(server, tmp_path):
+    start = END - 2499 * STEP
+    backfiller = make_backfiller(server, tmp_path)
+
+    assert backfiller.run(["BTCUSDT"], ["1m"], start, END) == {"BTCUSDT_1m": 2500}
+    assert [r["startTime"] for r in server.requests] == [start, start + 1000 * STEP, start + 2000 * STEP]
+    assert_contiguous(backfiller.store.read("BTCUSDT", "1m"), start, END)
+
+
+def test_resumes_from_checkpoint(server, tmp_path):
+    start = END - 2499 * STEP
+    server.fail_on = {2}
+    assert make_backfiller(server, tmp_path).run(["BTCUSDT"], ["1m"], start, END) == {"BTCUSDT_1m": 0}
+
+    server.requests.clear()
+    server.fail_on = set()
+    backfiller = make_backfiller(server, tmp_path)
+    assert backfiller.checkpoint["BTCUSDT_1m"]["next_start"] == start + 1000 * STEP
+    backfiller.run(["BTCUSDT"], ["1m"], start, END)
+
+    assert server.requests[0]["startTime"] == start + 1000 * STEP
+    assert_contiguous(backfiller.store.read("BTCUSDT", "1m"), start, END)
+
+
+def test_fills_history_before_live_candles(server, tmp_path):
+    # The live collector already wrote the last 5 minutes
+    store = CandleStore(str(tmp_path), retention=10_000)
+    for t in range(END - 4 * STEP, END + STEP, STEP):
+        store.append("BTCUSDT", "1m", {"timestamp": t, "open": 1, "high": 2, "low": 0.5,
+                                       "close": t // STEP, "volume": 3})
+    store.flush()
+
+    start = END - 3 * 1440 * STEP  # 3 days back
+    server.fail_on = {3}
+    make_backfiller(server, tmp_path).run(["BTCUSDT"], ["1m"], start, END)
+    assert (tmp_path / "BTCUSDT_1m.backfill").exists()  # staged pages survive the failure
+
+    server.fail_on = set()
+    backfiller = make_backfiller(server, tmp_path)
+    backfiller.run(["BTCUSDT"], ["1m"], start, END)
+
+    assert_contiguous(backfiller.store.read("BTCUSDT", "1m"), start, END)
+    assert not (tmp_path / "BTCUSDT_1m.backfill").exists()
+    assert "head_end" not in backfiller.checkpoint["BTCUSDT_1m"]
+
+
+def test_collector_cache_sees_backfilled_history(server, tmp_path):
+    collector = Collector({}, ["BTCUSDT"], ["1m"], data_dir=str(tmp_path), retention=10_000,
+                          base_url=server.url, cache=CandleCache(100), derived_intervals=[])
+    candle = {"open": 1, "high": 2, "low": 0.5, "volume": 3, "closed": True}
+    for t in range(END - 4 * STEP, END, STEP):
+        collector.save_candle("BTCUSDT", "1m", dict(candle, timestamp=t, close=t // STEP), repair=False)
+    assert len(collector.cache.last("BTCUSDT", "1m")) == 4
+
+    # The backfill CLI opens the same files through its own store, as another process would
+    make_backfiller(server, tmp_path).run(["BTCUSDT"], ["1m"], END - 500 * STEP, END - STEP)
+    collector.save_candle("BTCUSDT", "1m", dict(candle, timestamp=END, close=END // STEP), repair=False)
+
+    assert_contiguous(collector.cache.last("BTCUSDT", "1m"), END - 99 * STEP, END)
+    assert_contiguous(collector.store.read("BTCUSDT", "1m"), END - 500 * STEP, END)
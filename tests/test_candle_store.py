@@ -0,0 +1,32 @@
+import multiprocessing
+
+import numpy as np
+
+from app.candle_store import CandleSeries, CANDLE_DTYPE
+
+WRITES = 2000
+
+
+def append_range(path, first):
+    series = CandleSeries(path)
+    for ts in range(first, first + WRITES):
+        series.append(np.array((ts, 1, 2, 0.5, 1, 3), dtype=CANDLE_DTYPE))
+    series.flush()
+
+
+def test_appends_from_two_processes_are_not_lost(tmp_path):
+    path = str(tmp_path / "BTCUSDT_1m.candles")
+    CandleSeries(path, capacity=4 * WRITES).flush()
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=append_range, args=(path, first)) for first in (0, WRITES)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    series = CandleSeries(path)
+    assert series.total_appended == 2 * WRITES
+    assert series.version == 2 * WRITES
+    assert np.array_equal(np.sort(series.last()["timestamp"]), np.arange(2 * WRITES))
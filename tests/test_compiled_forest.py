@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from app.compiled_forest import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 1, (2000, 8))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int) + (X[:, 3] > 1) * 2
+    X[rng.random(X.shape) < 0.05] = np.nan  # trees learn where missing values go
+    return RandomForestClassifier(n_estimators=50, min_samples_leaf=3, random_state=1).fit(X, y)
+
+
+def inputs(forest):
+    rng = np.random.default_rng(1)
+    X = rng.normal(0, 1, (5000, 8))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    # Rows sitting exactly on split thresholds (after sklearn's float32 cast)
+    tree = forest.estimators_[0].tree_
+    splits = np.flatnonzero((tree.children_left >= 0) & np.isfinite(tree.threshold))[:200]
+    on_threshold = rng.normal(0, 1, (len(splits), 8))
+    on_threshold[np.arange(len(splits)), tree.feature[splits]] = tree.threshold[splits].astype(np.float32)
+    return np.vstack([X, on_threshold])
+
+
+def test_matches_sklearn_exactly(forest):
+    X = inputs(forest)
+    labels, proba = CompiledForest.from_sklearn(forest).predict_with_proba(X)
+
+    assert np.array_equal(proba, forest.predict_proba(X))
+    assert np.array_equal(labels, forest.predict(X))
+
+
+def test_rejects_infinity(forest):
+    X = inputs(forest)[:3]
+    X[1, 2] = np.inf
+    with pytest.raises(ValueError):
+        CompiledForest.from_sklearn(forest).predict_with_proba(X)
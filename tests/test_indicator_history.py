@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.candle_store import CandleStore
+from app.indicator_engine import DEFAULT_INDICATORS, IndicatorEngine
+from app.indicator_history import IndicatorHistory
+
+
+def candles(n, seed=1):
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(size=n))
+    return pd.DataFrame({'timestamp': pd.to_datetime(np.arange(n) * 60_000, unit='ms'), 'open': close,
+                         'high': close + 1, 'low': close - 1, 'close': close, 'volume': 1.0})
+
+
+def test_lost_state_is_rebuilt_from_the_full_candle_history(tmp_path):
+    df = candles(1200)
+    store = CandleStore(str(tmp_path / "candles"), retention=5000)
+    for row in df.to_dict('records'):
+        store.append('BTCUSDT', '1m', row)
+    engine = IndicatorEngine(history=IndicatorHistory(str(tmp_path / "history")), store=store)
+
+    engine.sync_history('BTCUSDT', '1m', df.iloc[:900])
+    os.remove(tmp_path / "history" / "BTCUSDT_1m" / "state.pkl")
+    assert engine.sync_history('BTCUSDT', '1m', df.iloc[900:1100]) == 200
+
+    stored = engine.history.read('BTCUSDT', '1m')
+    expected = engine.evaluate(engine._sources(df.iloc[:1100]))
+    for name in DEFAULT_INDICATORS:
+        np.testing.assert_allclose(stored[name], expected[name], rtol=1e-9, atol=1e-9, err_msg=name)
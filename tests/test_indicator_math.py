@@ -0,0 +1,187 @@
+# Reference values for the indicator kernels in app/indicator_math.py.
+#
+# The reference implementations are deliberately naive per-bar loops written
+# straight from the textbook definitions, so they share no code with the
+# NumPy kernels they check.
+import math
+
+import numpy as np
+import pytest
+
+from app.indicator_engine import IndicatorGraph
+
+EXTENDED_INDICATORS = ('rsi_wilder', 'stoch_k', 'stoch_d', 'plus_di', 'minus_di', 'adx', 'vwap',
+                       'obv', 'keltner_upper', 'keltner_lower', 'tenkan_sen', 'kijun_sen',
+                       'senkou_span_a', 'senkou_span_b', 'chikou_span')
+NAN = float('nan')
+
+
+def ohlcv(bars, seed):
+    """Random-walk candles with flat stretches (zero moves, equal highs/lows) to hit the edge cases."""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 1, bars)
+    steps[rng.random(bars) < 0.05] = 0.0
+    close = 100 + np.cumsum(steps)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.5, bars))
+    spread[rng.random(bars) < 0.02] = 0.0
+    return {
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, bars),
+    }
+
+
+def _wilder_ref(values, period, start):
+    out = [NAN] * len(values)
+    if len(values) < start + period:
+        return out
+    avg = sum(values[start:start + period]) / period
+    out[start + period - 1] = avg
+    for i in range(start + period, len(values)):
+        avg = (avg * (period - 1) + values[i]) / period
+        out[i] = avg
+    return out
+
+
+def _ratio(num, den, scale=100.0):
+    if math.isnan(num) or math.isnan(den) or den == 0:
+        if den == 0 and not math.isnan(num) and num != 0:
+            return math.copysign(math.inf, num)
+        return NAN
+    return scale * num / den
+
+
+def ref_rsi_wilder(close, period=14):
+    gains = [0.0] + [max(close[i] - close[i - 1], 0.0) for i in range(1, len(close))]
+    losses = [0.0] + [max(close[i - 1] - close[i], 0.0) for i in range(1, len(close))]
+    avg_gain, avg_loss = _wilder_ref(gains, period, 1), _wilder_ref(losses, period, 1)
+    out = []
+    for gain, loss in zip(avg_gain, avg_loss):
+        if math.isnan(gain) or (gain == 0 and loss == 0):
+            out.append(NAN)
+        elif loss == 0:
+            out.append(100.0)
+        else:
+            out.append(100 - 100 / (1 + gain / loss))
+    return out
+
+
+def ref_stochastic(high, low, close, k_period=14, d_period=3):
+    k = [NAN] * len(close)
+    for i in range(k_period - 1, len(close)):
+        hh, ll = max(high[i - k_period + 1:i + 1]), min(low[i - k_period + 1:i + 1])
+        k[i] = _ratio(close[i] - ll, hh - ll)
+    d = [NAN] * len(close)
+    for i in range(d_period - 1, len(close)):
+        window = k[i - d_period + 1:i + 1]
+        d[i] = sum(window) / d_period
+    return k, d
+
+
+def ref_dmi(high, low, close, period=14):
+    n = len(close)
+    tr, plus_dm, minus_dm = [high[0] - low[0]], [0.0], [0.0]
+    for i in range(1, n):
+        tr.append(max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])))
+        up, down = high[i] - high[i - 1], low[i - 1] - low[i]
+        plus_dm.append(up if up > down and up > 0 else 0.0)
+        minus_dm.append(down if down > up and down > 0 else 0.0)
+    atr = _wilder_ref(tr, period, 1)
+    plus_di = [_ratio(p, a) for p, a in zip(_wilder_ref(plus_dm, period, 1), atr)]
+    minus_di = [_ratio(m, a) for m, a in zip(_wilder_ref(minus_dm, period, 1), atr)]
+    dx = [_ratio(abs(p - m), p + m) for p, m in zip(plus_di, minus_di)]
+    return plus_di, minus_di, _wilder_ref(dx, period, period)
+
+
+def ref_vwap(high, low, close, volume):
+    out, pv, vol = [], 0.0, 0.0
+    for h, l, c, v in zip(high, low, close, volume):
+        pv += (h + l + c) / 3 * v
+        vol += v
+        out.append(pv / vol)
+    return out
+
+
+def ref_obv(close, volume):
+    out = [0.0]
+    for i in range(1, len(close)):
+        step = volume[i] if close[i] > close[i - 1] else -volume[i] if close[i] < close[i - 1] else 0.0
+        out.append(out[-1] + step)
+    return out
+
+
+def ref_keltner(high, low, close, span=20, atr_period=10, mult=2):
+    alpha, middle = 2 / (span + 1), [close[0]]
+    for price in close[1:]:
+        middle.append(alpha * price + (1 - alpha) * middle[-1])
+    tr = [high[0] - low[0]] + [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                               for i in range(1, len(close))]
+    atr = _wilder_ref(tr, atr_period, 0)
+    return [m + mult * a for m, a in zip(middle, atr)], [m - mult * a for m, a in zip(middle, atr)]
+
+
+def ref_ichimoku(high, low, close):
+    def mid(i, window):
+        if i < window - 1:
+            return NAN
+        return (max(high[i - window + 1:i + 1]) + min(low[i - window + 1:i + 1])) / 2
+
+    n = len(close)
+    tenkan = [mid(i, 9) for i in range(n)]
+    kijun = [mid(i, 26) for i in range(n)]
+    span_a = ([NAN] * 26 + [(tenkan[i] + kijun[i]) / 2 for i in range(n - 26)])[:n]
+    span_b = ([NAN] * 26 + [mid(i, 52) for i in range(n - 26)])[:n]
+    chikou = (list(close[26:]) + [NAN] * 26)[:n]
+    return tenkan, kijun, span_a, span_b, chikou
+
+
+def reference(data):
+    high, low, close, volume = (data[k].tolist() for k in ('high', 'low', 'close', 'volume'))
+    stoch_k, stoch_d = ref_stochastic(high, low, close)
+    plus_di, minus_di, adx = ref_dmi(high, low, close)
+    keltner_upper, keltner_lower = ref_keltner(high, low, close)
+    tenkan, kijun, span_a, span_b, chikou = ref_ichimoku(high, low, close)
+    return {
+        'rsi_wilder': ref_rsi_wilder(close), 'stoch_k': stoch_k, 'stoch_d': stoch_d,
+        'plus_di': plus_di, 'minus_di': minus_di, 'adx': adx,
+        'vwap': ref_vwap(high, low, close, volume), 'obv': ref_obv(close, volume),
+        'keltner_upper': keltner_upper, 'keltner_lower': keltner_lower,
+        'tenkan_sen': tenkan, 'kijun_sen': kijun, 'senkou_span_a': span_a,
+        'senkou_span_b': span_b, 'chikou_span': chikou,
+    }
+
+
+
+
+@pytest.fixture(scope="module")
+def series():
+    data = [ohlcv(600, seed) for seed in (1, 2)]
+    graph = IndicatorGraph()
+    single = graph.evaluate(data[0], EXTENDED_INDICATORS)
+    stacked = graph.evaluate({k: np.stack([d[k] for d in data]) for k in data[0]}, EXTENDED_INDICATORS)
+    return data, single, stacked, [reference(d) for d in data]
+
+
+@pytest.mark.parametrize("name", EXTENDED_INDICATORS)
+def test_matches_reference_1d(series, name):
+    _, single, _, expected = series
+    np.testing.assert_allclose(single[name], expected[0][name], rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("name", EXTENDED_INDICATORS)
+def test_matches_reference_per_row_2d(series, name):
+    _, _, stacked, expected = series
+    assert stacked[name].shape == (2, 600)
+    for row in range(2):
+        np.testing.assert_allclose(stacked[name][row], expected[row][name], rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_short_series():
+    data = ohlcv(10, 3)
+    values = IndicatorGraph().evaluate(data, EXTENDED_INDICATORS)
+    expected = reference(data)
+    for name, value in values.items():
+        np.testing.assert_allclose(value, expected[name], rtol=1e-9, atol=1e-9, equal_nan=True)
@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+websockets = pytest.importorskip("websockets")
+
+from app.candle_cache import CandleCache
+from app.collector import Collector
+from app.stream import KlineStream
+
+MINUTE = 60_000
+T0 = 1_700_000_040_000 // MINUTE * MINUTE
+
+
+def kline_message(symbol, minute, close, closed):
+    t = T0 + minute * MINUTE
+    return json.dumps({
+        "stream": f"{symbol.lower()}@kline_1m",
+        "data": {"e": "kline", "s": symbol, "k": {
+            "t": t, "i": "1m", "o": "1", "h": "9", "l": "0.5", "c": str(close), "v": "3", "x": closed,
+        }},
+    })
+
+
+def make_collector(root):
+    return Collector({}, ["BTCUSDT", "ETHUSDT"], ["1m"], data_dir=str(root), base_url="http://127.0.0.1:9",
+                     cache=CandleCache(100), derived_intervals=[])
+
+
+async def stream_from_server(tmp_path, connections):
+    """Run a KlineStream against a local server that sends one batch per connection and then closes."""
+    paths = []
+
+    async def handler(ws):
+        paths.append(ws.request.path)
+        for message in connections[len(paths) - 1] if len(paths) <= len(connections) else []:
+            await ws.send(message)
+        await ws.close()
+
+    collector = make_collector(tmp_path / "live")
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        stream = KlineStream(collector, ws_url=f"ws://127.0.0.1:{port}",
+                             record_path=str(tmp_path / "recorded.jsonl"), max_backoff=0.05)
+        task = asyncio.create_task(stream.run())
+        for _ in range(200):
+            if len(paths) > len(connections):
+                break
+            await asyncio.sleep(0.05)
+        stream.stop()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    return collector, stream, paths
+
+
+def test_stream_stores_closed_candles_and_reconnects(tmp_path):
+    connections = [
+        [kline_message("BTCUSDT", 0, 10, False), kline_message("BTCUSDT", 0, 11, True),
+         kline_message("ETHUSDT", 0, 20, True), kline_message("BTCUSDT", 1, 12, False)],
+        [kline_message("BTCUSDT", 1, 13, True), kline_message("ETHUSDT", 1, 21, False),
+         kline_message("ETHUSDT", 1, 22, True)],
+    ]
+    collector, stream, paths = asyncio.run(stream_from_server(tmp_path, connections))
+
+    # Every (re)connection subscribes to the same combined streams
+    assert len(paths) >= 3
+    assert set(paths) == {"/stream?streams=btcusdt@kline_1m/ethusdt@kline_1m"}
+
+    # Only closed candles are stored and published
+    assert stream.closed_candles == 4
+    btc = collector.store.read("BTCUSDT", "1m")
+    eth = collector.store.read("ETHUSDT", "1m")
+    assert list(btc["timestamp"]) == [T0, T0 + MINUTE] and list(btc["close"]) == [11, 13]
+    assert list(eth["close"]) == [20, 22]
+    assert collector.shared_state["BTCUSDT_1m"]["close"] == 13
+    assert collector.shared_state["ETHUSDT_1m"]["close"] == 22
+
+
+def test_replay_reproduces_store(tmp_path):
+    connections = [[kline_message("BTCUSDT", m, 100 + m, closed) for m in range(5) for closed in (False, True)]]
+    live, _, _ = asyncio.run(stream_from_server(tmp_path, connections))
+
+    # Replay into a store that already holds an older candle: no gap repair, no network
+    replayed = make_collector(tmp_path / "replay")
+    replayed.store.append("BTCUSDT", "1m", {"timestamp": T0 - 10 * MINUTE, "open": 1, "high": 1,
+                                            "low": 1, "close": 1, "volume": 1})
+    replayed.repair_gap = _no_network
+    assert KlineStream(replayed).replay(str(tmp_path / "recorded.jsonl")) == 5
+
+    assert np.array_equal(replayed.store.read("BTCUSDT", "1m")[1:], live.store.read("BTCUSDT", "1m"))
+
+
+def _no_network(*args, **kwargs):
+    raise AssertionError("replay must not repair gaps")
@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.candle_cache import CandleCache
+from app.collector import Collector
+from app.rate_limiter import WeightRateLimiter
+from app.symbol_index import ExchangeMetadata
+
+
+class ExchangeInfoServer:
+    """Stand-in for /exchangeInfo; answers HTTP 500 while `symbols` is None."""
+
+    def __init__(self):
+        self.symbols = None
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                if server.symbols is None:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                body = json.dumps({"symbols": [{"symbol": f"{base}USDT", "baseAsset": base, "quoteAsset": "USDT",
+                                                "status": "TRADING"} for base in server.symbols]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/v3"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = ExchangeInfoServer()
+    yield server
+    server.close()
+
+
+def test_failed_fetch_is_retried_and_index_follows_reloads(server, tmp_path):
+    collector = Collector({}, ["BTCUSDT"], ["1m"], data_dir=str(tmp_path), base_url=server.url,
+                          cache=CandleCache(10), derived_intervals=[])
+    metadata = ExchangeMetadata(server.url, cache_path=str(tmp_path / "exchange_info.json"), ttl=1.0,
+                                retry_delay=0.5, limiter=WeightRateLimiter(max_retries=0))
+    collector.metadata = metadata
+
+    # First fetch fails with no cache file: nothing is kept, and no retry before retry_delay
+    assert collector.all_symbols == []
+    assert collector.all_symbols == []
+    assert server.requests == 1
+
+    server.symbols = ["BTC", "ETH"]
+    time.sleep(0.6)
+    assert collector.all_symbols == ["BTCUSDT", "ETHUSDT"]
+    assert collector.symbol_index.resolve("how is ethereum") == "ETHUSDT"
+
+    # Once the TTL has passed the list is reloaded and the index rebuilt
+    server.symbols = ["BTC", "ETH", "SOL"]
+    time.sleep(1.1)
+    assert collector.symbol_index.resolve("solana price") == "SOLUSDT"
+    assert server.requests == 3